@@ -4,85 +4,186 @@ from pygame.locals import QUIT, KEYDOWN, K_RETURN
 import time
 import math
 import random
-
-# Initialize Pygame
-pygame.init()
-
-# Initialize controllers
-pygame.joystick.init()
-controllers = []
+import os
+import argparse
+import functools
+import itertools
+import operator
+import struct
+import zlib
+import timeit
+import tracemalloc
+import types
+import json
+import atexit
+import collections
+
+try:
+    import numpy as np
+except ImportError:  # Only the tron trail kernel needs NumPy
+    np = None
+
+MAX_ARENA_BALLS = 500  # Largest --arena-balls that still holds 60 fps
+
+
+def arena_ball_count(text):
+    """argparse type for --arena-balls: a count from 1 to MAX_ARENA_BALLS"""
+    count = int(text)
+    if not 1 <= count <= MAX_ARENA_BALLS:
+        raise argparse.ArgumentTypeError(
+            f"must be between 1 and {MAX_ARENA_BALLS}, not {count}")
+    return count
+
+
+def match_seed(text):
+    """argparse type for --seed: any integer an InputLog can store (int64)"""
+    seed = int(text)
+    if not -2**63 <= seed < 2**63:
+        raise argparse.ArgumentTypeError(
+            f"must be between {-2**63} and {2**63 - 1}, not {seed}")
+    return seed
+
+
+# Command-line options
+parser = argparse.ArgumentParser(description="Rolly")
+parser.add_argument('--headless', type=int, metavar='FRAMES',
+                    help="Simulate FRAMES frames without a window and exit")
+parser.add_argument('--players', type=int, default=1, choices=[1, 2, 3, 4],
+                    help="Player count for a headless run")
+parser.add_argument('--mode', default="Normal",
+                    choices=["Normal", "Last Standing", "Co-op", "Arena"],
+                    help="Game mode for a headless run")
+parser.add_argument('--arena-balls', type=arena_ball_count, default=100,
+                    metavar='COUNT',
+                    help="AI balls in a headless Arena run "
+                         f"(1 to {MAX_ARENA_BALLS}, default 100)")
+parser.add_argument('--seed', type=match_seed,
+                    help="Seed match randomness so runs can be reproduced")
+parser.add_argument('--record', metavar='DIR',
+                    help="Save an input log of every match into DIR")
+parser.add_argument('--replay', metavar='LOG',
+                    help="Replay a recorded input log without a window")
+parser.add_argument('--dirty-rects', action='store_true',
+                    help="Update only the changed parts of the window")
+parser.add_argument('--benchmark-broadphase', action='store_true',
+                    help="Print collision pair checks per frame and exit")
+parser.add_argument('--benchmark-balls', action='store_true',
+                    help="Print ball memory and field access costs and exit")
+parser.add_argument('--input-latency', action='store_true',
+                    help="Print input-to-physics latency after each match")
+parser.add_argument('--benchmark-audio', action='store_true',
+                    help="Print mixer start-up time and sound load costs and exit")
+parser.add_argument('--benchmark-arena', action='store_true',
+                    help="Print per-phase frame times of Arena matches from "
+                         "50 to 500 AI balls and exit")
+parser.add_argument('--benchmark', action='store_true',
+                    help="Time hot functions and whole scenarios and exit")
+parser.add_argument('--benchmark-save', metavar='FILE',
+                    help="Write --benchmark results to FILE as a JSON baseline")
+parser.add_argument('--benchmark-compare', metavar='FILE',
+                    help="Flag --benchmark results slower than a FILE baseline")
+parser.add_argument('--benchmark-threshold', type=float, default=25,
+                    metavar='PERCENT',
+                    help="Slowdown --benchmark-compare flags (default 25%%)")
+parser.add_argument('--perf-overlay', action='store_true',
+                    help="Start matches with the performance overlay (F3) on")
+parser.add_argument('--render', action='store_true',
+                    help="Draw every --headless or --replay frame offscreen "
+                         "and report the cost")
+parser.add_argument('--capture', metavar='DIR',
+                    help="Save every game frame drawn as a PNG in DIR")
+parser.add_argument('--capture-checksums', metavar='FILE',
+                    help="Write a CRC32 of every game frame drawn to FILE")
+parser.add_argument('--trace', metavar='FILE',
+                    help="Record frame phases and screens as a Chrome trace, "
+                         "written to FILE on exit or with F4")
+args = parser.parse_args([])  # Defaults until run() reads the command line
+
+# Small mixer buffer so a sound starts within a few ms of being played
+AUDIO_FREQUENCY = 44100
+AUDIO_BUFFER = 512  # Samples per mixer callback, about 12 ms at 44.1 kHz
+audio_init_time = None  # Seconds init_audio() took to open the mixer
+
+# Controllers, opened by init_controllers()
+controllers = []  # Joystick per player slot, None for an empty slot
+controller_slots = {}  # Joystick instance ID -> player slot
+CONTROLLER_DEADZONE = 0.15  # Stick deflection below this reads as centred
 
 
 def init_controllers():
     """Initialize all connected controllers"""
-    global controllers
-    controllers = []
-    for i in range(pygame.joystick.get_count()):
-        controller = pygame.joystick.Joystick(i)
-        controller.init()
+    pygame.joystick.init()
+    for device_index in range(pygame.joystick.get_count()):
+        add_controller(device_index)
+    return len(controller_slots)
+
+
+def add_controller(device_index):
+    """Open a newly connected controller in the first free player slot.
+
+    Controllers that are already open keep their slots, so plugging in or
+    removing one pad never renumbers the others.
+    """
+    controller = pygame.joystick.Joystick(device_index)
+    instance_id = controller.get_instance_id()
+    if instance_id in controller_slots:
+        return  # Already open, e.g. the added event for a pad found at startup
+
+    controller.init()
+    if None in controllers:
+        slot = controllers.index(None)
+        controllers[slot] = controller
+    else:
+        slot = len(controllers)
         controllers.append(controller)
-        print(f"Controller {i + 1} connected: {controller.get_name()}")
-    return len(controllers)
+    controller_slots[instance_id] = slot
+    print(f"Controller {slot + 1} connected: {controller.get_name()}")
 
 
-def check_for_new_controllers():
-    """Check if controllers have been connected/disconnected"""
-    current_count = pygame.joystick.get_count()
-    if current_count != len(controllers):
-        return init_controllers()
-    return len(controllers)
+def remove_controller(instance_id):
+    """Free the player slot of a disconnected controller"""
+    slot = controller_slots.pop(instance_id, None)
+    if slot is None:
+        return
 
+    controllers[slot] = None
+    while controllers and controllers[-1] is None:
+        controllers.pop()
+    print(f"Controller {slot + 1} disconnected")
 
-def get_controller_input(controller_index):
-    """Get analog stick input from a controller"""
-    if controller_index >= len(controllers):
-        return 0, 0
 
-    try:
-        controller = controllers[controller_index]
-        x_axis = controller.get_axis(0)  # Left stick X axis
-        y_axis = controller.get_axis(1)  # Left stick Y axis
+def handle_controller_event(event):
+    """Apply a controller hot-plug event; other events are ignored"""
+    if event.type == pygame.JOYDEVICEADDED:
+        add_controller(event.device_index)
+    elif event.type == pygame.JOYDEVICEREMOVED:
+        remove_controller(event.instance_id)
 
-        # Apply deadzone
-        deadzone = 0.15
-        if abs(x_axis) < deadzone:
-            x_axis = 0
-        if abs(y_axis) < deadzone:
-            y_axis = 0
 
-        return x_axis, y_axis
-    except BaseException:
-        return 0, 0
+def get_controller(slot):
+    """Return the controller in a player slot, or None"""
+    if slot < len(controllers):
+        return controllers[slot]
+    return None
 
 
 def handle_controller_menu_input():
     """Process controller input for menu navigation"""
-    for controller in controllers:
-        try:
-            # D-pad/analog for navigation
-            y_axis = controller.get_axis(1)
-            x_axis = controller.get_axis(0)
-
-            # Get D-pad input if available
-            hat_y = 0
-            hat_x = 0
-            if controller.get_numhats() > 0:
-                hat_x, hat_y = controller.get_hat(0)
-
-            if y_axis < -0.5 or hat_y > 0:
-                return "UP"
-            elif y_axis > 0.5 or hat_y < 0:
-                return "DOWN"
-            elif x_axis < -0.5 or hat_x < 0:
-                return "LEFT"
-            elif x_axis > 0.5 or hat_x > 0:
-                return "RIGHT"
-
-            # A button (0) or Start button (7) to confirm
-            if controller.get_button(0) or controller.get_button(7):
-                return "SELECT"
-        except BaseException:
-            continue
+    input_sampler.sample_controllers()
+    for x_axis, y_axis, hat_x, hat_y, confirm in input_sampler.pads:
+        # D-pad/analog for navigation
+        if y_axis < -0.5 or hat_y > 0:
+            return "UP"
+        elif y_axis > 0.5 or hat_y < 0:
+            return "DOWN"
+        elif x_axis < -0.5 or hat_x < 0:
+            return "LEFT"
+        elif x_axis > 0.5 or hat_x > 0:
+            return "RIGHT"
+
+        # A button (0) or Start button (7) to confirm
+        if confirm:
+            return "SELECT"
 
     return None
 
@@ -92,6 +193,12 @@ WIDTH, HEIGHT = 800, 800
 BACKGROUND_COLOR = (0, 0, 100)  # Dark blue background
 FPS = 60
 
+# Physics runs at a fixed rate, independent of how fast frames are drawn.
+# Ball speeds, friction and AI tuning all assume 60 steps per second.
+PHYSICS_HZ = 60
+MAX_FRAME_TIME = 250  # Most real time (ms) one frame may catch up on
+MAX_RENDER_FPS = 240  # Render cap; frames in between physics are interpolated
+
 # Colors
 RED = (255, 0, 0)
 DARK_RED = (200, 0, 0)
@@ -145,96 +252,294 @@ PLATFORM_SIZE = 600
 PLATFORM_X = (WIDTH - PLATFORM_SIZE) // 2
 PLATFORM_Y = (HEIGHT - PLATFORM_SIZE) // 2
 
-# Initialize screen and clock
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Rolly V0.51 with Controller Support & Co-op")
-clock = pygame.time.Clock()
-
-# Fonts
-pygame.font.init()
-title_font = pygame.font.Font(None, 150)  # Large font for the title
-# Smaller font for menu options (changed from 50)
-subtitle_font = pygame.font.Font(None, 40)
-score_font = pygame.font.Font(None, 40)  # Font for score-keeping
-# Small font for controller indicators
-controller_font = pygame.font.Font(None, 24)
-
-# Sounds (optional, placeholder if you have files)
-pygame.mixer.init()
-collision_sound = pygame.mixer.Sound("collision.wav")
-rolling_sound = pygame.mixer.Sound("rolling.wav")
-rolling_sound.set_volume(0)
-rolling_channel = pygame.mixer.Channel(0)
+# Window, clock and fonts, created by init_display()
+screen = None
+clock = None
+title_font = subtitle_font = score_font = controller_font = None
+
+
+def init_display(offscreen=False):
+    """Start pygame and open the game window, clock and fonts.
+
+    Call init_audio() first: pygame.init() would otherwise open the mixer
+    with its default, higher-latency buffer. With offscreen=True the SDL
+    dummy drivers are used, so the "window" is a plain in-memory surface
+    and no display or sound device is needed.
+    """
+    global screen, clock
+    global title_font, subtitle_font, score_font, controller_font
+    if offscreen:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+
+    # Initialize screen and clock
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(
+        "Rolly V0.51 with Controller Support & Co-op")
+    clock = pygame.time.Clock()
+
+    # Fonts
+    title_font = pygame.font.Font(None, 150)  # Large font for the title
+    # Smaller font for menu options (changed from 50)
+    subtitle_font = pygame.font.Font(None, 40)
+    score_font = pygame.font.Font(None, 40)  # Font for score-keeping
+    # Small font for controller indicators
+    controller_font = pygame.font.Font(None, 24)
+
+
+def set_render_target(surface=None):
+    """Send all drawing to surface, or back to the window if None.
+
+    Every draw_* function draws onto the module's screen, so pointing it
+    at another Surface renders a frame there instead. Returns the previous
+    target so it can be restored.
+    """
+    global screen
+    previous = screen
+    screen = pygame.display.get_surface() if surface is None else surface
+    return previous
+
+
+class FrameCapture:
+    """Saves finished game frames as PNGs and/or CRC32 checksums.
+
+    Frames are numbered from 1 in the order end_frame() finishes them.
+    Checksums cover the RGB pixels, so two runs drawing the same frames
+    write identical checksum files.
+    """
+
+    def __init__(self, directory=None, checksum_path=None):
+        self.directory = directory
+        self.frame = 0
+        self.checksum_file = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if checksum_path:
+            self.checksum_file = open(checksum_path, 'w')
+            atexit.register(self.checksum_file.close)
+
+    def capture(self, surface):
+        """Record one finished frame"""
+        self.frame += 1
+        if self.directory:
+            pygame.image.save(surface, os.path.join(
+                self.directory, f"frame-{self.frame:06d}.png"))
+        if self.checksum_file:
+            checksum = zlib.crc32(pygame.image.tobytes(surface, 'RGB'))
+            self.checksum_file.write(f"{self.frame} {checksum:08x}\n")
+
+
+frame_capture = None  # FrameCapture when --capture options are given
+
+
+# Sounds, opened by init_audio(). Only the collision sound is played;
+# rolling.wav ships with the game but nothing plays it, so it is not loaded.
+collision_sound = None
+UNUSED_SOUNDS = ("rolling.wav",)
+
+
+# Collision sounds get their own reserved mixer channels
+COLLISION_CHANNELS = 4
+COLLISION_SOUND_WINDOW = 150  # ms before the same pair can sound again
+COLLISION_MIN_VOLUME = 0.15  # Volume of a glancing touch
+COLLISION_FULL_VOLUME_SPEED = 10  # Closing speed (px per step) at full volume
+
+
+class CollisionSounds:
+    """Plays collision sounds on a small pool of reserved mixer channels.
+
+    Each pair of colliding things sounds at most once per
+    COLLISION_SOUND_WINDOW ms, so a sustained push no longer triggers a
+    play every step. Volume follows how fast the pair closed in. When
+    every pooled channel is busy, the oldest sound is cut off for the new
+    one rather than piling up.
+    """
+
+    def __init__(self):
+        self.sound = None
+        self.channels = []  # Oldest-started channel first; empty until open()
+        self.last_played = {}  # Pair key -> game time it last sounded
+        self.pruned_at = 0  # Game time last_played was last pruned
+
+    def open(self, sound, first_channel, count):
+        """Reserve count mixer channels from first_channel for sound"""
+        pygame.mixer.set_reserved(first_channel + count)
+        self.sound = sound
+        self.channels = [pygame.mixer.Channel(index) for index in
+                         range(first_channel, first_channel + count)]
+
+    def play(self, key, impact, current_time):
+        """Sound a collision of the pair key closing at impact px per step"""
+        if not self.channels:
+            return  # No audio in this process
+
+        last_played = self.last_played.get(key)
+        if (last_played is not None and
+                0 <= current_time - last_played < COLLISION_SOUND_WINDOW):
+            return
+
+        if not 0 <= current_time - self.pruned_at < COLLISION_SOUND_WINDOW:
+            # Forget pairs that have been quiet for a while, at most once
+            # per window however many pairs are colliding
+            self.last_played = {
+                pair: time_played
+                for pair, time_played in self.last_played.items()
+                if 0 <= current_time - time_played < COLLISION_SOUND_WINDOW}
+            self.pruned_at = current_time
+        self.last_played[key] = current_time
+
+        # Use an idle channel if there is one, otherwise steal the oldest
+        channel = self.channels[0]
+        for candidate in self.channels:
+            if not candidate.get_busy():
+                channel = candidate
+                break
+        self.channels.remove(channel)
+        self.channels.append(channel)
+
+        channel.set_volume(min(1.0, COLLISION_MIN_VOLUME + (
+            1 - COLLISION_MIN_VOLUME) * max(impact, 0) /
+            COLLISION_FULL_VOLUME_SPEED))
+        channel.play(self.sound)
+
+
+collision_sounds = CollisionSounds()
+
+
+def init_audio():
+    """Open the mixer with a small buffer and load the collision sound"""
+    global audio_init_time, collision_sound
+    start = time.perf_counter()
+    pygame.mixer.pre_init(AUDIO_FREQUENCY, -16, 2, AUDIO_BUFFER)
+    pygame.mixer.init()
+    audio_init_time = time.perf_counter() - start
+
+    collision_sound = pygame.mixer.Sound("collision.wav")
+    collision_sounds.open(collision_sound, 0, COLLISION_CHANNELS)
+
+
+# Game-logic clock. A headless Simulation points this at its own frame
+# counter so powerup timers and spawn immunity run on simulated time.
+ticks_source = pygame.time.get_ticks
+
+
+# Random source for match logic; each Simulation binds its own seeded one
+match_rng = random.Random()
+
+
+def get_ticks():
+    """Current game time in milliseconds"""
+    return ticks_source()
+
+
+# Every piece of state a game ball carries
+BALL_FIELDS = (
+    'x', 'y', 'vx', 'vy', 'colors', 'radius', 'base_radius', 'powerup',
+    'powerup_end', 'last_hit_by', 'trail', 'frozen', 'frozen_end',
+    'heavy_hit', 'hit_flash_start', 'tron_trail', 'tron_index',
+    'spawn_immunity_end', 'is_ai', 'speed_multiplier')
+
+
+class Ball:
+    """A game ball with its state in __slots__.
+
+    Slots make a ball several times smaller than the equivalent dict, and
+    hot code reads fields as attributes. Item access (ball['x'],
+    ball.get('frozen', False), 'trail' in ball) still works for code
+    written against the old ball dicts.
+    """
+    __slots__ = BALL_FIELDS
+
+    def __init__(self, x, y, colors, is_ai=False, speed_multiplier=1.0,
+                 radius=BALL_RADIUS):
+        self.x = x
+        self.y = y
+        self.vx = 0
+        self.vy = 0
+        self.colors = colors
+        self.radius = radius
+        self.base_radius = radius  # Radius without grow or shrink
+        self.powerup = None
+        self.powerup_end = 0
+        self.last_hit_by = None
+        self.trail = []
+        self.frozen = False
+        self.frozen_end = 0
+        self.heavy_hit = False
+        self.hit_flash_start = 0
+        self.tron_trail = []  # List to store trail segments
+        self.tron_index = None  # Grid of tron_trail, see tron_trail_index
+        self.spawn_immunity_end = 0
+        self.is_ai = is_ai
+        self.speed_multiplier = speed_multiplier
+
+    # Item access goes straight to the slots; an unknown key raises
+    # AttributeError rather than KeyError
+    __getitem__ = object.__getattribute__
+    __setitem__ = object.__setattr__
+
+    def __contains__(self, key):
+        return key in BALL_FIELDS
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return list(BALL_FIELDS)
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in BALL_FIELDS]
+
+
+def create_ball(x, y, colors, **extra):
+    """Create a ball at rest with no powerups"""
+    return Ball(x, y, colors, **extra)
+
+
+# Reads every field of a Ball into a tuple in one call
+get_ball_fields = operator.attrgetter(*BALL_FIELDS)
+TRAIL_FIELD = BALL_FIELDS.index('trail')
+TRON_TRAIL_FIELD = BALL_FIELDS.index('tron_trail')
+TRON_INDEX_FIELD = BALL_FIELDS.index('tron_index')
+
+
+def copy_tron_trail(tron_trail):
+    """Copy a tron trail; only its last segment is still changed in place"""
+    if not tron_trail:
+        return []
+    return tron_trail[:-1] + [dict(tron_trail[-1])]
+
+
+def save_ball_state(ball):
+    """Capture a ball's fields as a tuple for restore_ball_state()"""
+    state = list(get_ball_fields(ball))
+    state[TRAIL_FIELD] = list(state[TRAIL_FIELD])
+    state[TRON_TRAIL_FIELD] = copy_tron_trail(state[TRON_TRAIL_FIELD])
+    state[TRON_INDEX_FIELD] = None  # Rebuilt from the trail when needed
+    return tuple(state)
+
+
+def restore_ball_state(ball, state):
+    """Write a save_ball_state() tuple back into the same ball"""
+    for name, value in zip(BALL_FIELDS, state):
+        setattr(ball, name, value)
+    # The saved lists stay untouched so a state can be restored again
+    ball.trail = list(state[TRAIL_FIELD])
+    ball.tron_trail = copy_tron_trail(state[TRON_TRAIL_FIELD])
+
 
 # Ball setup
-red_ball = {
-    'x': PLATFORM_X + 150,
-    'y': PLATFORM_Y + 150,
-    'vx': 0,
-    'vy': 0,
-    'colors': [DARKER_RED, DARK_RED, RED],
-    'radius': BALL_RADIUS,
-    'powerup': None,
-    'powerup_end': 0,
-    'last_hit_by': None,
-    'trail': [],
-    'frozen': False,
-    'frozen_end': 0,
-    'heavy_hit': False,
-    'hit_flash_start': 0,
-    'tron_trail': []  # List to store trail segments
-}
-blue_ball = {
-    'x': PLATFORM_X + 450,
-    'y': PLATFORM_Y + 150,
-    'vx': 0,
-    'vy': 0,
-    'colors': [DARKER_BLUE, DARK_BLUE, BLUE],
-    'radius': BALL_RADIUS,
-    'powerup': None,
-    'powerup_end': 0,
-    'last_hit_by': None,
-    'trail': [],
-    'frozen': False,
-    'frozen_end': 0,
-    'heavy_hit': False,
-    'hit_flash_start': 0,
-    'tron_trail': []  # List to store trail segments
-}
-orange_ball = {
-    'x': PLATFORM_X + 150,
-    'y': PLATFORM_Y + 450,
-    'vx': 0,
-    'vy': 0,
-    'colors': [DARKER_ORANGE, DARK_ORANGE, ORANGE],
-    'radius': BALL_RADIUS,
-    'powerup': None,
-    'powerup_end': 0,
-    'last_hit_by': None,
-    'trail': [],
-    'frozen': False,
-    'frozen_end': 0,
-    'heavy_hit': False,
-    'hit_flash_start': 0,
-    'tron_trail': []  # List to store trail segments
-}
-purple_ball = {
-    'x': PLATFORM_X + 450,
-    'y': PLATFORM_Y + 450,
-    'vx': 0,
-    'vy': 0,
-    'colors': [DARKER_PLAYER_PURPLE, DARK_PLAYER_PURPLE, PLAYER_PURPLE],
-    'radius': BALL_RADIUS,
-    'powerup': None,
-    'powerup_end': 0,
-    'last_hit_by': None,
-    'trail': [],
-    'frozen': False,
-    'frozen_end': 0,
-    'heavy_hit': False,
-    'hit_flash_start': 0,
-    'tron_trail': []  # List to store trail segments
-}
+red_ball = create_ball(PLATFORM_X + 150, PLATFORM_Y + 150,
+                       [DARKER_RED, DARK_RED, RED])
+blue_ball = create_ball(PLATFORM_X + 450, PLATFORM_Y + 150,
+                        [DARKER_BLUE, DARK_BLUE, BLUE])
+orange_ball = create_ball(PLATFORM_X + 150, PLATFORM_Y + 450,
+                          [DARKER_ORANGE, DARK_ORANGE, ORANGE])
+purple_ball = create_ball(
+    PLATFORM_X + 450,
+    PLATFORM_Y + 450,
+    [DARKER_PLAYER_PURPLE, DARK_PLAYER_PURPLE, PLAYER_PURPLE])
 
 # Score
 score = {'red': 0, 'blue': 0, 'orange': 0, 'purple': 0, 'ai': 0}
@@ -266,6 +571,8 @@ selected_platform_size = PLATFORM_SIZES[1]  # Default to medium (600)
 POWERUP_INTERVALS = [30000, 15000, 7500]
 selected_powerup_interval = POWERUP_INTERVALS[1]  # Default to normal speed
 
+POWERUP_TYPES = ['grow', 'shrink', 'shield', 'freeze', 'heavy', 'tron']
+
 # Add after other powerup constants
 POWERUP_DURATIONS = {
     'grow': 10000,    # 10 seconds
@@ -277,38 +584,51 @@ POWERUP_DURATIONS = {
 }
 
 # Add after other constants - UPDATE: Added Co-op mode
-GAME_MODES = ["Normal", "Last Standing", "Co-op"]
+GAME_MODES = ["Normal", "Last Standing", "Co-op", "Arena"]
 selected_game_mode = GAME_MODES[0]  # Default to normal mode
+COOP_MODES = ("Co-op", "Arena")  # Players team up against coop_ai_balls
+
+# AI balls an Arena match starts with
+ARENA_BALL_COUNTS = [50, 100, 200, 500]
+selected_arena_balls = ARENA_BALL_COUNTS[1]  # Default to 100
+ARENA_RING_SPACING = BALL_RADIUS * 2 + 4  # Between full-size arena balls
+
+# Pre-rendered ball sprites kept by draw_ball; the heavy-hit flash cycles
+# through many outline colors, so leave room beyond one entry per ball
+BALL_SPRITE_CACHE_SIZE = 256
+SPRITE_COLORKEY = (255, 0, 254)  # Transparent corners of cached sprites
+
+# Dirty-rect rendering: game frames restore and push to the display only
+# the areas drawn last frame and this frame, instead of repainting and
+# flipping the whole window. Enabled with --dirty-rects.
+dirty_rect_rendering = False
+recording_dirty_rects = False
+dirty_rects = []  # Areas drawn so far this frame
+previous_dirty_rects = []  # Areas drawn last frame, erased this frame
+
+# Outlined text labels kept by draw_text_with_outline; scores and level
+# numbers change rarely, so this comfortably holds a whole screen of HUD
+TEXT_CACHE_SIZE = 128
 
 # Add after other global constants
 TRAIL_LENGTH = 4  # Number of ghost images in trail
 TRAIL_FADE = 0.1  # How quickly the trail fades (0-1)
 TRAIL_SPACING = 20  # Minimum pixels between trail images
 
+# Grid cell size for indexing tron trail segments; a few segment lengths
+TRON_CELL_SIZE = 64
+# Candidate segments above which one NumPy pass beats the scalar loop
+TRON_KERNEL_MIN_SEGMENTS = 48
+
 # Add AI ball colors
 AI_GRAY = (70, 70, 70)
 AI_DARK_GRAY = (50, 50, 50)
 AI_DARKER_GRAY = (30, 30, 30)
 
 # Add AI ball setup
-ai_ball = {
-    'x': PLATFORM_X + 450,
-    'y': PLATFORM_Y + 150,
-    'vx': 0,
-    'vy': 0,
-    'colors': [AI_DARKER_GRAY, AI_DARK_GRAY, AI_GRAY],
-    'radius': BALL_RADIUS,
-    'powerup': None,
-    'powerup_end': 0,
-    'last_hit_by': None,
-    'trail': [],
-    'frozen': False,
-    'frozen_end': 0,
-    'heavy_hit': False,
-    'hit_flash_start': 0,
-    'tron_trail': [],  # List to store trail segments
-    'is_ai': True  # Flag to identify AI-controlled ball
-}
+ai_ball = create_ball(PLATFORM_X + 450, PLATFORM_Y + 150,
+                      [AI_DARKER_GRAY, AI_DARK_GRAY, AI_GRAY],
+                      is_ai=True)  # Flag to identify AI-controlled ball
 
 # Add these constants for AI behavior
 AI_CHASE_DISTANCE = 300  # Distance at which AI starts chasing player
@@ -359,7 +679,7 @@ def update_platform_position():
 
     # Only update positions of active balls
     for color, ball in active_balls.items():
-        ball['x'], ball['y'] = spawn_pos[color]
+        ball.x, ball.y = spawn_pos[color]
 
 
 def get_spawn_positions():
@@ -400,84 +720,180 @@ def get_spawn_positions():
 def reset_balls(fallen_ball=None):
     """Reset ball positions and clear powerups."""
     spawn_pos = get_spawn_positions()
-    current_time = pygame.time.get_ticks()
+    current_time = get_ticks()
 
     if fallen_ball:
         # Only reset the fallen ball
         for color, ball in get_active_balls().items():
             if ball == fallen_ball:
-                ball['x'], ball['y'] = spawn_pos[color]
-                ball['vx'], ball['vy'] = 0, 0
-                ball['powerup'] = None
-                ball['radius'] = BALL_RADIUS
-                ball['trail'] = []
-                ball['frozen'] = False
-                ball['frozen_end'] = 0
-                ball['heavy_hit'] = False
-                ball['hit_flash_start'] = 0
-                ball['tron_trail'] = []
-                ball['spawn_immunity_end'] = current_time + \
+                ball.x, ball.y = spawn_pos[color]
+                ball.vx, ball.vy = 0, 0
+                ball.powerup = None
+                ball.radius = BALL_RADIUS
+                ball.trail = []
+                ball.frozen = False
+                ball.frozen_end = 0
+                ball.heavy_hit = False
+                ball.hit_flash_start = 0
+                ball.tron_trail = []
+                ball.spawn_immunity_end = current_time + \
                     SPAWN_IMMUNITY_DURATION
                 break
     else:
         # Reset all balls
         active_balls = get_active_balls()
         for color, ball in active_balls.items():
-            ball['x'], ball['y'] = spawn_pos[color]
-            ball['vx'], ball['vy'] = 0, 0
-            ball['powerup'] = None
-            ball['radius'] = BALL_RADIUS
-            ball['last_hit_by'] = None
-            ball['trail'] = []
-            ball['frozen'] = False
-            ball['frozen_end'] = 0
-            ball['heavy_hit'] = False
-            ball['hit_flash_start'] = 0
-            ball['tron_trail'] = []
-            ball['spawn_immunity_end'] = current_time + SPAWN_IMMUNITY_DURATION
+            ball.x, ball.y = spawn_pos[color]
+            ball.vx, ball.vy = 0, 0
+            ball.powerup = None
+            ball.radius = BALL_RADIUS
+            ball.last_hit_by = None
+            ball.trail = []
+            ball.frozen = False
+            ball.frozen_end = 0
+            ball.heavy_hit = False
+            ball.hit_flash_start = 0
+            ball.tron_trail = []
+            ball.spawn_immunity_end = current_time + SPAWN_IMMUNITY_DURATION
 
         # Only clear powerups on stage when resetting all balls
         global powerups
         powerups = []
 
-        # Skip the ready screen for Co-op mode
-        if (selected_player_count <= 2 or selected_game_mode ==
-                "Last Standing") and selected_game_mode != "Co-op":
-            # Draw current state
-            screen.fill(BACKGROUND_COLOR)
-            draw_platform()
-            for ball in get_active_balls().values():
-                draw_ball(ball)
-            draw_scores()
-            draw_text_with_outline(
-                "Ready...",
-                subtitle_font,
-                WIDTH // 2,
-                HEIGHT // 2,
-                WHITE,
-                BLACK,
-                center=True)
-            pygame.display.flip()
-            pygame.time.wait(1000)  # 1 second pause
 
-        # Add brief pause in 1-player, 2-player mode or Last Standing mode
-        if selected_player_count <= 2 or selected_game_mode == "Last Standing":
-            # Draw current state
-            screen.fill(BACKGROUND_COLOR)
-            draw_platform()
-            for ball in get_active_balls().values():
-                draw_ball(ball)
-            draw_scores()
-            draw_text_with_outline(
-                "Ready...",
-                subtitle_font,
-                WIDTH // 2,
-                HEIGHT // 2,
-                WHITE,
-                BLACK,
-                center=True)
-            pygame.display.flip()
-            pygame.time.wait(1000)  # 1 second pause
+TRACE_BUFFER_SPANS = 200000  # Most recent spans kept for a trace
+# Trace viewer rows: screens contain transitions and frames, which may
+# straddle each other, so each category gets its own row
+TRACE_ROWS = {'screen': 0, 'transition': 1, 'frame': 2}
+
+
+class Tracer:
+    """Ring buffer of timed spans, written out as a Chrome trace.
+
+    Spans are (name, category, start, end) with perf_counter() times.
+    The categories are 'frame' for frame phases (recorded by
+    PerfOverlay.lap()), 'transition' for message overlays and 'screen'
+    for whole screens. Only the last TRACE_BUFFER_SPANS are kept, so a
+    long session can be traced without growing memory. flush() writes
+    them as complete ('X') trace events, which chrome://tracing and
+    Perfetto load directly.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.origin = 0.0
+        self.spans = collections.deque(maxlen=TRACE_BUFFER_SPANS)
+
+    def start(self, path):
+        """Start recording; spans are written to path at exit"""
+        self.enabled = True
+        self.path = path
+        self.origin = time.perf_counter()
+        atexit.register(self.flush)
+
+    def span(self, name, category, start, end):
+        """Record one finished span"""
+        self.spans.append((name, category, start, end))
+
+    def flush(self):
+        """Write the buffered spans to the trace file"""
+        if not self.enabled:
+            return
+        pid = os.getpid()
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': row,
+                   'args': {'name': category + 's'}}
+                  for category, row in TRACE_ROWS.items()]
+        events += [{'name': name, 'cat': category, 'ph': 'X', 'pid': pid,
+                    'tid': TRACE_ROWS[category],
+                    'ts': (start - self.origin) * 1e6,
+                    'dur': (end - start) * 1e6}
+                   for name, category, start, end in self.spans]
+        with open(self.path, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'},
+                      trace_file)
+        print(f"Wrote {len(self.spans)} trace spans to {self.path}")
+
+
+tracer = Tracer()
+
+
+def trace_screen(screen_function):
+    """Record each run of a screen function as a 'screen' trace span"""
+    @functools.wraps(screen_function)
+    def traced(*args, **kwargs):
+        if not tracer.enabled:
+            return screen_function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return screen_function(*args, **kwargs)
+        finally:
+            tracer.span(screen_function.__name__, 'screen', start,
+                        time.perf_counter())
+    return traced
+
+
+# Timed overlays (start, ready and level messages) queued for the game
+# loops, which keep handling events and redrawing while one is up instead
+# of sleeping through it
+transitions = []
+
+
+def schedule_transition(draw, duration):
+    """Queue an overlay drawn by draw() for duration milliseconds"""
+    transitions.append({'draw': draw, 'duration': duration, 'end': None})
+
+
+def update_transitions():
+    """Drop finished overlays and return True while one is showing"""
+    current_time = pygame.time.get_ticks()
+    while transitions:
+        # An overlay's time starts when it first comes up
+        if transitions[0]['end'] is None:
+            transitions[0]['end'] = current_time + transitions[0]['duration']
+            transitions[0]['started'] = time.perf_counter()
+        if current_time < transitions[0]['end']:
+            return True
+        finished = transitions.pop(0)
+        if tracer.enabled:
+            tracer.span(finished['draw'].__name__, 'transition',
+                        finished['started'], time.perf_counter())
+    return False
+
+
+def draw_transition():
+    """Draw the overlay currently showing"""
+    transitions[0]['draw']()
+    pygame.display.flip()
+
+
+def show_ready_message():
+    """Queue the "Ready..." pause that follows a full reset"""
+    # Skip the ready screen for Co-op and Arena
+    if (selected_player_count <= 2 or selected_game_mode ==
+            "Last Standing") and selected_game_mode not in COOP_MODES:
+        schedule_transition(draw_ready_message, 1000)  # 1 second pause
+
+    # Add brief pause in 1-player, 2-player mode or Last Standing mode
+    if (selected_player_count <= 2 or selected_game_mode ==
+            "Last Standing") and selected_game_mode not in COOP_MODES:
+        schedule_transition(draw_ready_message, 1000)  # 1 second pause
+
+
+def draw_ready_message():
+    """Draw the current state with "Ready..." over it"""
+    draw_platform()
+    for ball in get_active_balls().values():
+        draw_ball(ball)
+    draw_scores()
+    draw_text_with_outline(
+        "Ready...",
+        subtitle_font,
+        WIDTH // 2,
+        HEIGHT // 2,
+        WHITE,
+        BLACK,
+        center=True)
 
 
 def handle_title_ball_collision(ball1, ball2):
@@ -535,18 +951,15 @@ def animate_title_balls(balls, active_count):
 
     # Draw all active balls
     for ball in active_balls:
-        draw_ball({
-            'x': ball['pos']['x'],
-            'y': ball['pos']['y'],
-            'radius': BALL_RADIUS,
-            'colors': ball['colors'],
-            'powerup': None
-        })
+        draw_ball(create_ball(
+            ball['pos']['x'], ball['pos']['y'], ball['colors']))
 
 
+@trace_screen
 def title_screen():
-    global selected_win_score, selected_player_count, selected_platform_size, selected_powerup_interval, selected_game_mode
+    global selected_win_score, selected_player_count, selected_platform_size, selected_powerup_interval, selected_game_mode, selected_arena_balls
     selected_score_index = 0
+    selected_arena_index = 1
     selected_player_index = 0
     selected_platform_index = 1
     selected_powerup_index = 1
@@ -620,6 +1033,7 @@ def title_screen():
             ball['elapsed'] = elapsed_time
 
         for event in pygame.event.get():
+            handle_controller_event(event)
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
@@ -653,7 +1067,11 @@ def title_screen():
                             if selected_player_count == 2 and selected_game_mode == "Last Standing":
                                 selected_game_mode = "Normal"
                     elif selected_option == 2:  # Score
-                        if selected_game_mode != "Co-op":  # Only allow changing score in non-Co-op modes
+                        if selected_game_mode == "Arena":  # Arena size in place of the score
+                            selected_arena_index = (
+                                selected_arena_index - 1) % len(ARENA_BALL_COUNTS)
+                            selected_arena_balls = ARENA_BALL_COUNTS[selected_arena_index]
+                        elif selected_game_mode != "Co-op":  # Only allow changing score in non-Co-op modes
                             selected_score_index = (
                                 selected_score_index - 1) % len(WIN_SCORES)
                             selected_win_score = WIN_SCORES[selected_score_index]
@@ -682,7 +1100,11 @@ def title_screen():
                             if selected_player_count == 2 and selected_game_mode == "Last Standing":
                                 selected_game_mode = "Normal"
                     elif selected_option == 2:  # Score
-                        if selected_game_mode != "Co-op":  # Only allow changing score in non-Co-op modes
+                        if selected_game_mode == "Arena":  # Arena size in place of the score
+                            selected_arena_index = (
+                                selected_arena_index + 1) % len(ARENA_BALL_COUNTS)
+                            selected_arena_balls = ARENA_BALL_COUNTS[selected_arena_index]
+                        elif selected_game_mode != "Co-op":  # Only allow changing score in non-Co-op modes
                             selected_score_index = (
                                 selected_score_index + 1) % len(WIN_SCORES)
                             selected_win_score = WIN_SCORES[selected_score_index]
@@ -722,9 +1144,14 @@ def title_screen():
                             if selected_player_count == 2 and selected_game_mode == "Last Standing":
                                 selected_game_mode = "Normal"
                     elif selected_option == 2:  # Score
-                        selected_score_index = (
-                            selected_score_index - 1) % len(WIN_SCORES)
-                        selected_win_score = WIN_SCORES[selected_score_index]
+                        if selected_game_mode == "Arena":  # Arena size in place of the score
+                            selected_arena_index = (
+                                selected_arena_index - 1) % len(ARENA_BALL_COUNTS)
+                            selected_arena_balls = ARENA_BALL_COUNTS[selected_arena_index]
+                        else:
+                            selected_score_index = (
+                                selected_score_index - 1) % len(WIN_SCORES)
+                            selected_win_score = WIN_SCORES[selected_score_index]
                     elif selected_option == 3:  # Platform
                         selected_platform_index = (
                             selected_platform_index - 1) % len(PLATFORM_SIZES)
@@ -750,9 +1177,14 @@ def title_screen():
                             if selected_player_count == 2 and selected_game_mode == "Last Standing":
                                 selected_game_mode = "Normal"
                     elif selected_option == 2:  # Score
-                        selected_score_index = (
-                            selected_score_index + 1) % len(WIN_SCORES)
-                        selected_win_score = WIN_SCORES[selected_score_index]
+                        if selected_game_mode == "Arena":  # Arena size in place of the score
+                            selected_arena_index = (
+                                selected_arena_index + 1) % len(ARENA_BALL_COUNTS)
+                            selected_arena_balls = ARENA_BALL_COUNTS[selected_arena_index]
+                        else:
+                            selected_score_index = (
+                                selected_score_index + 1) % len(WIN_SCORES)
+                            selected_win_score = WIN_SCORES[selected_score_index]
                     elif selected_option == 3:  # Platform
                         selected_platform_index = (
                             selected_platform_index + 1) % len(PLATFORM_SIZES)
@@ -820,6 +1252,8 @@ def title_screen():
         score_text = f"First to {selected_win_score} points"
         if selected_game_mode == "Co-op":
             score_text = "Co-op Mode: Survive As Long As Possible"
+        elif selected_game_mode == "Arena":
+            score_text = f"Arena: {selected_arena_balls} AI Balls"
         draw_text_with_outline(
             score_text,
             subtitle_font,
@@ -868,8 +1302,8 @@ def title_screen():
             center=True)
 
         # Draw controller status
-        if len(controllers) > 0:
-            controller_text = f"{len(controllers)} Controller(s) connected"
+        if controller_slots:
+            controller_text = f"{len(controller_slots)} Controller(s) connected"
             draw_text_with_outline(
                 controller_text,
                 subtitle_font,
@@ -884,6 +1318,11 @@ def title_screen():
 
 
 def show_start_message():
+    """Queue the "Start!" screen shown before a match"""
+    schedule_transition(draw_start_message, 1000)
+
+
+def draw_start_message():
     screen.fill(BACKGROUND_COLOR)
     draw_text_with_outline(
         "Start!",
@@ -893,53 +1332,193 @@ def show_start_message():
         WHITE,
         BLACK,
         center=True)
-    pygame.display.flip()
-    time.sleep(1)
 
 
-def move_ball(ball, keys, up, down, left, right, controller_index=-1):
-    """Move ball using keyboard or controller input"""
-    if ball.get('frozen', False):
-        return  # Don't move if frozen
+# Keyboard bindings (up, down, left, right) and controller slot per player
+PLAYER_CONTROLS = {
+    'red': ((pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d), 0),
+    'blue': ((pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT), 1),
+    'orange': ((pygame.K_i, pygame.K_k, pygame.K_j, pygame.K_l), 2),
+    'purple': ((pygame.K_KP8, pygame.K_KP5, pygame.K_KP4, pygame.K_KP6), 3)
+}
+
+
+# Bit set in a player's input byte when a controller is assigned to them
+# and two int8 stick axes follow; bits 0-3 are up, down, left, right
+INPUT_HAS_AXES = 0x10
+
+
+def decode_player_input(bits, x_axis, y_axis):
+    """Turn one player's packed input into (x, y) movement"""
+    x_input = (bits >> 3 & 1) - (bits >> 2 & 1)  # right - left
+    y_input = (bits >> 1 & 1) - (bits & 1)  # down - up
 
-    # Keyboard input
-    if keys[up]:
-        ball['vy'] -= BALL_SPEED
-    if keys[down]:
-        ball['vy'] += BALL_SPEED
-    if keys[left]:
-        ball['vx'] -= BALL_SPEED
-    if keys[right]:
-        ball['vx'] += BALL_SPEED
-
-    # Controller input
-    if controller_index >= 0 and controller_index < len(controllers):
-        x_axis, y_axis = get_controller_input(controller_index)
+    if bits & INPUT_HAS_AXES:
         # Slightly higher sensitivity for controller
-        ball['vx'] += x_axis * BALL_SPEED * 1.5
-        ball['vy'] += y_axis * BALL_SPEED * 1.5
+        x_input += x_axis / 127 * 1.5
+        y_input += y_axis / 127 * 1.5
+
+    return x_input, y_input
+
+
+def decode_input_state(state):
+    """Turn an InputSampler state into {color: (x, y)} movement"""
+    return {color: decode_player_input(*player)
+            for color, player in zip(PLAYER_CONTROLS, state)}
+
+
+class InputSampler:
+    """Reads every input device once per frame.
+
+    sample() reads the keyboard and each controller's stick, D-pad and
+    confirm buttons into preallocated slots, with the stick deadzone
+    already applied. Player movers take the read-only movement view,
+    input logs take state and menus take pads, so nothing else polls a
+    device during the frame.
+
+    state holds (bits, x_axis, y_axis) per player in PLAYER_CONTROLS
+    order, with the stick axes quantised to -127..127. This is what input
+    logs store, so live play and replays see exactly the same input.
+
+    When input changes, the time until the first physics step that
+    applies it is recorded as input-to-physics latency.
+    """
+
+    def __init__(self):
+        self.pads = []  # [x_axis, y_axis, hat_x, hat_y, confirm] per slot
+        self.state = [[0, 0, 0] for _ in PLAYER_CONTROLS]
+        self._movement = dict.fromkeys(PLAYER_CONTROLS, (0, 0))
+        self.movement = types.MappingProxyType(self._movement)
+        self.sample_time = 0.0
+        self.reset_latency()
+
+    def reset_latency(self):
+        """Forget pending input changes and latency statistics"""
+        self.change_time = None  # When unapplied input was first sampled
+        self.latency_count = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def sample_controllers(self):
+        """Read each connected controller once into pads"""
+        while len(self.pads) < len(controllers):
+            self.pads.append([0.0, 0.0, 0, 0, False])
+
+        for slot, pad in enumerate(self.pads):
+            controller = get_controller(slot)
+            if controller is None:
+                pad[:] = 0.0, 0.0, 0, 0, False
+                continue
+
+            try:
+                x_axis = controller.get_axis(0)  # Left stick X axis
+                y_axis = controller.get_axis(1)  # Left stick Y axis
+
+                # Apply deadzone
+                if abs(x_axis) < CONTROLLER_DEADZONE:
+                    x_axis = 0.0
+                if abs(y_axis) < CONTROLLER_DEADZONE:
+                    y_axis = 0.0
+
+                # Get D-pad input if available
+                hat_x = hat_y = 0
+                if controller.get_numhats() > 0:
+                    hat_x, hat_y = controller.get_hat(0)
+
+                # A button (0) or Start button (7)
+                buttons = controller.get_numbuttons()
+                confirm = bool((buttons > 0 and controller.get_button(0)) or
+                               (buttons > 7 and controller.get_button(7)))
+
+                pad[:] = x_axis, y_axis, hat_x, hat_y, confirm
+            except pygame.error:
+                pad[:] = 0.0, 0.0, 0, 0, False
+
+    def confirm_pressed(self):
+        """Return whether any controller's A or Start button is held"""
+        return any(pad[4] for pad in self.pads)
+
+    def sample(self, keys):
+        """Sample the keyboard and all controllers for this frame"""
+        self.sample_time = time.perf_counter()
+        self.sample_controllers()
+
+        changed = False
+        for player, (color, (bindings, slot)) in zip(
+                self.state, PLAYER_CONTROLS.items()):
+            bits = 0
+            for bit, key in enumerate(bindings):
+                if keys[key]:
+                    bits |= 1 << bit
+
+            x_axis = y_axis = 0
+            if get_controller(slot) is not None:
+                pad = self.pads[slot]
+                bits |= INPUT_HAS_AXES
+                x_axis = round(pad[0] * 127)
+                y_axis = round(pad[1] * 127)
+
+            if player[0] != bits or player[1] != x_axis or player[2] != y_axis:
+                player[:] = bits, x_axis, y_axis
+                self._movement[color] = decode_player_input(
+                    bits, x_axis, y_axis)
+                changed = True
+
+        if changed and self.change_time is None:
+            self.change_time = self.sample_time
+
+    def consume(self):
+        """Note that a physics step is applying the current sample"""
+        if self.change_time is None:
+            return
+        latency = time.perf_counter() - self.change_time
+        self.change_time = None
+        self.latency_count += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def latency_summary(self):
+        """Describe the input-to-physics latency seen so far"""
+        if not self.latency_count:
+            return "Input latency: no input changes"
+        mean = self.latency_total / self.latency_count
+        return (f"Input latency: {self.latency_count} changes, "
+                f"mean {mean * 1000:.2f} ms, "
+                f"max {self.latency_max * 1000:.2f} ms")
+
+
+input_sampler = InputSampler()
+
+
+def move_ball(ball, x_input, y_input):
+    """Move ball from its player's movement input"""
+    if ball.frozen:
+        return  # Don't move if frozen
+
+    ball.vx += x_input * BALL_SPEED
+    ball.vy += y_input * BALL_SPEED
 
 
 def draw_controller_indicators():
     """Show which controller is assigned to which player"""
     active_balls = get_active_balls()
 
-    if len(controllers) > 0 and 'red' in active_balls:
+    if get_controller(0) is not None and 'red' in active_balls:
         controller_text = "🎮1"
         draw_text_with_outline(controller_text, controller_font,
                                55, 15, RED, BLACK, center=True)
 
-    if len(controllers) > 1 and 'blue' in active_balls:
+    if get_controller(1) is not None and 'blue' in active_balls:
         controller_text = "🎮2"
         draw_text_with_outline(controller_text, controller_font,
                                WIDTH - 60, 15, BLUE, BLACK, center=True)
 
-    if len(controllers) > 2 and 'orange' in active_balls:
+    if get_controller(2) is not None and 'orange' in active_balls:
         controller_text = "🎮3"
         draw_text_with_outline(controller_text, controller_font,
                                55, HEIGHT - 15, ORANGE, BLACK, center=True)
 
-    if len(controllers) > 3 and 'purple' in active_balls:
+    if get_controller(3) is not None and 'purple' in active_balls:
         controller_text = "🎮4"
         draw_text_with_outline(
             controller_text,
@@ -951,90 +1530,240 @@ def draw_controller_indicators():
             center=True)
 
 
-def main_game():
-    global powerups, last_powerup_spawn
+# Module globals that make up one match; a Simulation keeps its own copy
+# and swaps it in around every step
+SIMULATION_STATE = (
+    'red_ball', 'blue_ball', 'orange_ball', 'purple_ball', 'ai_ball',
+    'score', 'powerups', 'last_powerup_spawn',
+    'coop_level', 'coop_ai_balls', 'eliminated_players', 'active_roster',
+    'match_rng',
+    'selected_player_count', 'selected_game_mode', 'selected_win_score',
+    'selected_platform_size', 'selected_powerup_interval',
+    'selected_arena_balls')
+
+
+class Simulation:
+    """Display-free match state advanced one frame at a time with step().
+
+    Owns the balls, powerups, score and Co-op state of a single match and
+    runs the same physics, collision, powerup and scoring rules as the
+    game window. Without a clock it runs on simulated time (1000 /
+    PHYSICS_HZ ms per step), so it can be stepped as fast as the CPU allows.
+
+    All match randomness (powerup spawns, AI choices) comes from match_rng,
+    seeded with seed or a fresh random seed kept in self.seed, so a seed
+    and the same inputs replay a simulated-time match exactly.
+
+    A Co-op match starts at coop_level, with that many AI balls. An
+    Arena match is one Co-op level with arena_balls AI balls, won by
+    knocking them all off.
+    """
+
+    def __init__(self, player_count=None, game_mode=None, win_score=None,
+                 platform_size=None, powerup_interval=None, clock=None,
+                 seed=None, coop_level=1, arena_balls=None):
+        self.selected_player_count = (
+            selected_player_count if player_count is None else player_count)
+        self.selected_game_mode = (
+            selected_game_mode if game_mode is None else game_mode)
+        self.selected_win_score = (
+            selected_win_score if win_score is None else win_score)
+        self.selected_platform_size = (
+            selected_platform_size if platform_size is None else platform_size)
+        self.selected_powerup_interval = (
+            selected_powerup_interval if powerup_interval is None
+            else powerup_interval)
+        self.selected_arena_balls = (
+            selected_arena_balls if arena_balls is None else arena_balls)
+        self.clock = clock  # None for simulated time
+        self.frame = 0
+        self.previous_positions = {}  # id(ball) -> (x, y) before last step
+        self.time_ms = clock() if clock else 0
+        self.winner = None
+
+        self.red_ball = create_ball(0, 0, [DARKER_RED, DARK_RED, RED])
+        self.blue_ball = create_ball(0, 0, [DARKER_BLUE, DARK_BLUE, BLUE])
+        self.orange_ball = create_ball(
+            0, 0, [DARKER_ORANGE, DARK_ORANGE, ORANGE])
+        self.purple_ball = create_ball(
+            0, 0, [DARKER_PLAYER_PURPLE, DARK_PLAYER_PURPLE, PLAYER_PURPLE])
+        self.ai_ball = create_ball(
+            0, 0, [AI_DARKER_GRAY, AI_DARK_GRAY, AI_GRAY], is_ai=True)
+        self.score = {'red': 0, 'blue': 0, 'orange': 0, 'purple': 0, 'ai': 0}
+        self.powerups = []
+        self.last_powerup_spawn = self.time_ms
+        self.coop_level = coop_level
+        self.coop_ai_balls = []
+        self.eliminated_players = set()
+        self.active_roster = Roster()
+        self.seed = random.randrange(2**32) if seed is None else seed
+        self.match_rng = random.Random(self.seed)
+
+        self.bind()
+        if self.selected_game_mode in COOP_MODES:
+            init_coop_mode(coop_level)
+        else:
+            reset_balls()
+        self.active_balls = dict(get_active_balls())
+        self._unbind()
+
+    def _ticks(self):
+        return self.time_ms
+
+    def bind(self):
+        """Make this match the one the module-level game functions act on"""
+        global ticks_source, PLATFORM_X, PLATFORM_Y, PLATFORM_SIZE
+        namespace = globals()
+        for name in SIMULATION_STATE:
+            namespace[name] = getattr(self, name)
+        ticks_source = self.clock or self._ticks
+
+        PLATFORM_SIZE = self.selected_platform_size
+        PLATFORM_X = (WIDTH - PLATFORM_SIZE) // 2
+        PLATFORM_Y = (HEIGHT - PLATFORM_SIZE) // 2
+
+    def _unbind(self):
+        """Pick up globals the game functions rebound during a step"""
+        namespace = globals()
+        for name in SIMULATION_STATE:
+            setattr(self, name, namespace[name])
+
+    def step(self, inputs=None):
+        """Advance one frame.
+
+        inputs maps player colors to (x, y) movement input as returned by
+        decode_input_state(); missing players are treated as idle.
+        Returns a list of events the caller may want to present:
+        'winner', 'round_reset', 'level_up', 'game_over' or 'victory'.
+        """
+        self.frame += 1
+        if self.clock:
+            self.time_ms = self.clock()
+        else:
+            self.time_ms = self.frame * 1000 // PHYSICS_HZ
 
-    # Special handling for Co-op mode
-    if selected_game_mode == "Co-op":
-        coop_game()
-        return
+        self.previous_positions = {
+            id(ball): (ball.x, ball.y) for ball in self.balls_in_play()}
 
-    # Reset game state
-    reset_balls()
-    powerups = []
-    last_powerup_spawn = pygame.time.get_ticks()
-    active_balls = get_active_balls()
+        self.bind()
+        try:
+            if self.selected_game_mode in COOP_MODES:
+                events = self._step_coop(inputs or {}, self.time_ms)
+            else:
+                events = self._step_versus(inputs or {}, self.time_ms)
+        finally:
+            self._unbind()
+        return events
+
+    def _apply_physics(self, ball_list):
+        """Move balls and pick up any powerups they roll over"""
+        for ball in ball_list:
+            apply_physics(ball)
+            check_powerup_collision(ball)
 
-    # Check for controllers periodically
-    controller_check_time = pygame.time.get_ticks()
+    def _handle_collisions(self, ball_list):
+        """Resolve collisions between balls that are close enough"""
+        for ball1, ball2 in collision_pairs(ball_list):
+            handle_collision(ball1, ball2)
 
-    while True:
-        current_time = pygame.time.get_ticks()
-        keys = pygame.key.get_pressed()
+    def _off_platform(self, ball_list):
+        """Whether each ball in ball_list has fallen off the platform"""
+        return [is_off_platform(ball) for ball in ball_list]
+
+    def snapshot(self):
+        """Capture the whole match for restore().
+
+        Every SIMULATION_STATE global is saved: balls as their field
+        tuples next to the ball objects, containers as shallow copies, and
+        match_rng as its state. Restoring writes back into the same ball
+        objects, so references between balls (last_hit_by) stay valid.
+        Nothing is deep-copied; powerups and trail entries are never
+        changed after creation, apart from the tron segment still being
+        stretched, which gets its own copy.
+        """
+        balls = {}
+        for ball in ([self.red_ball, self.blue_ball, self.orange_ball,
+                      self.purple_ball, self.ai_ball] + self.coop_ai_balls):
+            balls[id(ball)] = (ball, save_ball_state(ball))
+
+        state = {}
+        for name in SIMULATION_STATE:
+            value = getattr(self, name)
+            if name == 'coop_ai_balls':
+                value = list(value)
+            elif name in ('score', 'powerups', 'eliminated_players'):
+                value = value.copy()
+            elif name == 'match_rng':
+                value = value.getstate()
+            state[name] = value
+
+        return (state, tuple(balls.values()), self.frame, self.time_ms,
+                self.winner, dict(self.previous_positions),
+                dict(self.active_balls))
+
+    def restore(self, snapshot):
+        """Return the match to a snapshot() taken from this Simulation.
+
+        A snapshot can be restored any number of times.
+        """
+        (state, balls, self.frame, self.time_ms, self.winner,
+         previous_positions, active_balls) = snapshot
+
+        for name, value in state.items():
+            if name in ('coop_ai_balls', 'score', 'powerups',
+                        'eliminated_players'):
+                value = value.copy()
+            elif name == 'match_rng':
+                self.match_rng.setstate(value)
+                continue
+            setattr(self, name, value)
+        for ball, ball_state in balls:
+            restore_ball_state(ball, ball_state)
+
+        self.previous_positions = dict(previous_positions)
+        self.active_balls = dict(active_balls)
+        self.active_roster.invalidate()
+        self.bind()
 
-        # Check for controller changes every few seconds
-        if current_time - controller_check_time > 3000:
-            check_for_new_controllers()
-            controller_check_time = current_time
+    def balls_in_play(self):
+        """All balls currently on the platform, players first"""
+        return list(self.active_balls.values()) + self.coop_ai_balls
+
+    def draw_position(self, ball, alpha):
+        """Ball position blended between the last two physics steps"""
+        previous = self.previous_positions.get(id(ball))
+        if previous is None:
+            return ball.x, ball.y
+
+        dx = ball.x - previous[0]
+        dy = ball.y - previous[1]
+        if dx * dx + dy * dy > (BALL_RADIUS * 4) ** 2:
+            return ball.x, ball.y  # Respawned - don't smear across
+
+        return previous[0] + dx * alpha, previous[1] + dy * alpha
+
+    def _step_versus(self, inputs, current_time):
+        global last_powerup_spawn
+        events = []
+        active_balls = self.active_balls
 
         # Handle player movements based on active balls
-        if 'red' in active_balls:
-            move_ball(
-                red_ball,
-                keys,
-                pygame.K_w,
-                pygame.K_s,
-                pygame.K_a,
-                pygame.K_d,
-                0)  # Controller 0 for Red
-
-        if 'blue' in active_balls:
-            move_ball(
-                blue_ball,
-                keys,
-                pygame.K_UP,
-                pygame.K_DOWN,
-                pygame.K_LEFT,
-                pygame.K_RIGHT,
-                1 if len(controllers) > 1 else -
-                1)  # Controller 1 for Blue if available
-
-        if 'orange' in active_balls:
-            move_ball(
-                orange_ball,
-                keys,
-                pygame.K_i,
-                pygame.K_k,
-                pygame.K_j,
-                pygame.K_l,
-                2 if len(controllers) > 2 else -
-                1)  # Controller 2 for Orange if available
-
-        if 'purple' in active_balls:
-            move_ball(
-                purple_ball,
-                keys,
-                pygame.K_KP8,
-                pygame.K_KP5,
-                pygame.K_KP4,
-                pygame.K_KP6,
-                3 if len(controllers) > 3 else -
-                1)  # Controller 3 for Purple if available
+        for color, ball in active_balls.items():
+            if color in PLAYER_CONTROLS and color in inputs:
+                move_ball(ball, *inputs[color])
+        perf_overlay.lap('physics')
 
         # Handle AI movement in 1-player mode
         if selected_player_count == 1 and 'ai' in active_balls:
             move_ai_ball(ai_ball, red_ball, current_time)
+        perf_overlay.lap('ai')
 
         # Check for win condition
         for color in active_balls:
             if score[color] >= selected_win_score:
-                # Convert color name for winner display
-                if color == 'ai':
-                    winner_name = 'Black'
-                else:
-                    winner_name = color.capitalize()
-                show_winner(winner_name)
-                return
+                self.winner = color
+                events.append('winner')
+                return events
 
         # Spawn powerups periodically using selected interval
         if current_time - last_powerup_spawn > selected_powerup_interval:
@@ -1042,32 +1771,17 @@ def main_game():
                 powerups.append(spawn_powerup())
                 last_powerup_spawn = current_time
 
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-
         # Apply physics and check collisions for active balls
-        for ball in active_balls.values():
-            apply_physics(ball)
-            check_powerup_collision(ball)
-
-        # Generate collision pairs for active balls
-        ball_pairs = []
         ball_list = list(active_balls.values())
-        for i in range(len(ball_list)):
-            for j in range(i + 1, len(ball_list)):
-                ball_pairs.append((ball_list[i], ball_list[j]))
-
-        # Handle collisions
-        for ball1, ball2 in ball_pairs:
-            handle_collision(ball1, ball2)
+        self._apply_physics(ball_list)
+        perf_overlay.lap('physics')
+        self._handle_collisions(ball_list)
+        perf_overlay.lap('collisions')
 
         # Check if any active ball is off platform
-        fallen_balls = []
-        for color, ball in active_balls.items():
-            if is_off_platform(ball):
-                fallen_balls.append((color, ball))
+        fallen_balls = [
+            (color, ball) for (color, ball), off in
+            zip(active_balls.items(), self._off_platform(ball_list)) if off]
 
         if fallen_balls:
             if selected_game_mode == "Last Standing" and selected_player_count > 2:
@@ -1079,19 +1793,21 @@ def main_game():
                     # Last player standing gets the point
                     last_color = list(active_balls.keys())[0]
                     score[last_color] += 1
-                    active_balls = get_active_balls()  # Reset active balls dictionary
+                    active_balls = dict(get_active_balls())  # Reset active balls dictionary
                     reset_balls()  # Reset all balls for next round
+                    events.append('round_reset')
                 elif len(active_balls) == 0:
                     # Everyone fell off, reset all balls with no points awarded
-                    active_balls = get_active_balls()  # Reset active balls dictionary
+                    active_balls = dict(get_active_balls())  # Reset active balls dictionary
                     reset_balls()
+                    events.append('round_reset')
             else:
                 # Normal mode scoring
                 for color, ball in fallen_balls:
-                    if ball['last_hit_by'] is not None:
+                    if ball.last_hit_by is not None:
                         # Give point to the player who knocked this ball off
                         for other_color, other_ball in active_balls.items():
-                            if other_ball == ball['last_hit_by']:
+                            if other_ball == ball.last_hit_by:
                                 score[other_color] += 1
                                 break
                     else:
@@ -1108,39 +1824,879 @@ def main_game():
                         reset_balls(ball)
                 else:
                     reset_balls()  # Reset all balls
+                    events.append('round_reset')
+        self.active_balls = active_balls
 
         # Check powerup expiry for all active balls
         for ball in active_balls.values():
             check_powerup_expiry(ball)
 
-        # Inside the main loop, after applying physics:
         for ball in active_balls.values():
             # Check if frozen state should end
-            if ball.get(
-                    'frozen',
-                    False) and current_time >= ball.get(
-                    'frozen_end',
-                    0):
-                ball['frozen'] = False
-                ball['frozen_end'] = 0
+            if ball.frozen and current_time >= ball.frozen_end:
+                ball.frozen = False
+                ball.frozen_end = 0
+
+        perf_overlay.lap('physics')
 
         # After applying physics to all balls
         for ball in active_balls.values():
             check_tron_trail_collision(ball)
+        perf_overlay.lap('tron')
 
-        screen.fill(BACKGROUND_COLOR)
-        draw_platform()
-        draw_powerups()
-        for ball in active_balls.values():
-            draw_ball(ball)
-        draw_scores()
+        return events
 
-        # Draw controller indicators if controllers are connected
-        if len(controllers) > 0:
-            draw_controller_indicators()
+    def _step_coop(self, inputs, current_time):
+        global last_powerup_spawn, eliminated_players, coop_level, powerups
+        events = []
+        active_players = self.active_balls  # Only human players
 
-        pygame.display.flip()
-        clock.tick(FPS)
+        # Handle player movements
+        for color, ball in active_players.items():
+            if color in inputs:
+                move_ball(ball, *inputs[color])
+        perf_overlay.lap('physics')
+
+        # Handle AI movements
+        for ai_ball in coop_ai_balls:
+            # Find closest human player to target
+            closest_player = None
+            closest_dist = float('inf')
+
+            for player_ball in active_players.values():
+                dx = player_ball.x - ai_ball.x
+                dy = player_ball.y - ai_ball.y
+                dist = math.sqrt(dx * dx + dy * dy)
+
+                if dist < closest_dist:
+                    closest_dist = dist
+                    closest_player = player_ball
+
+            if closest_player:
+                # Use the existing AI movement code with the closest player
+                move_ai_ball_coop(ai_ball, closest_player, current_time)
+        perf_overlay.lap('ai')
+
+        # Spawn powerups
+        if current_time - last_powerup_spawn > selected_powerup_interval:
+            if len(powerups) < 3:
+                powerups.append(spawn_powerup())
+                last_powerup_spawn = current_time
+
+        # Apply physics to all balls and check powerup collisions
+        # (players come first, so player-vs-AI collision pairs keep the
+        # player as ball1)
+        ball_list = list(active_players.values()) + coop_ai_balls
+        self._apply_physics(ball_list)
+        perf_overlay.lap('physics')
+        self._handle_collisions(ball_list)
+        perf_overlay.lap('collisions')
+
+        # Check for fallen players and AI
+        off = self._off_platform(ball_list)
+        fallen_players = [
+            (color, player_ball) for (color, player_ball), player_off in
+            zip(active_players.items(), off) if player_off]
+        fallen_ai = [i for i, ai_off in
+                     enumerate(off[len(active_players):]) if ai_off]
+
+        # Handle fallen players in Co-op mode
+        for color, player_ball in fallen_players:
+            # Mark player as eliminated
+            eliminated_players.add(color)
+            active_roster.invalidate()
+            # Remove from active players
+            del active_players[color]
+
+        # Remove fallen AI (in reverse order to avoid index issues)
+        for i in sorted(fallen_ai, reverse=True):
+            coop_ai_balls.pop(i)
+
+        # Check end conditions
+        if not active_players:
+            # All players eliminated - game over
+            events.append('game_over')
+            return events
+
+        if not coop_ai_balls:
+            if selected_game_mode == "Arena":
+                # The whole arena knocked off - victory!
+                events.append('victory')
+                return events
+
+            # All AI eliminated - advance to next level
+            coop_level += 1
+            if coop_level > MAX_AI_BALLS:
+                # Player beat the maximum level - victory!
+                events.append('victory')
+                return events
+
+            # Reset eliminated players for next level - everyone comes back
+            eliminated_players = set()
+            active_roster.invalidate()
+
+            # Reset all ball positions to proper spawn positions and clear
+            # powerups for all players
+            spawn_pos = get_spawn_positions()
+            for color, player_ball in get_active_balls().items():
+                player_ball.x, player_ball.y = spawn_pos[color]
+                player_ball.vx, player_ball.vy = 0, 0
+                player_ball.powerup = None
+                player_ball.radius = BALL_RADIUS
+
+            # Clear all powerups on the field
+            powerups = []
+
+            # Update active players
+            active_players = dict(get_active_balls())
+            self.active_balls = active_players
+
+            # Spawn new AI balls for next level
+            spawn_coop_ai_balls()
+            events.append('level_up')
+
+        # Apply physics effects after collisions, players before AI
+        ball_list = list(active_players.values()) + coop_ai_balls
+        for ball in ball_list:
+            # Check powerup expiry
+            check_powerup_expiry(ball)
+            # Check frozen state
+            if ball.frozen and current_time >= ball.frozen_end:
+                ball.frozen = False
+                ball.frozen_end = 0
+        perf_overlay.lap('physics')
+
+        # Check tron trail collisions
+        for ball in ball_list:
+            check_tron_trail_collision(ball)
+        perf_overlay.lap('tron')
+
+        return events
+
+
+class FixedTimestep:
+    """Accumulator that turns elapsed real time into fixed physics steps.
+
+    Each frame, advance() adds the real time since the previous call and
+    returns how many steps of 1000 / rate ms are due; alpha is how far the
+    leftover time reaches into the next step, for interpolated drawing.
+    """
+
+    def __init__(self, rate=PHYSICS_HZ, max_frame_time=MAX_FRAME_TIME):
+        self.step_ms = 1000 / rate
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0
+        self.last_time = time.perf_counter()
+
+    def reset(self):
+        """Drop accumulated time, e.g. after a blocking message screen"""
+        self.accumulator = 0
+        self.last_time = time.perf_counter()
+
+    def advance(self):
+        now = time.perf_counter()
+        # Clamp long stalls so the game slows down instead of spiralling
+        self.accumulator += min((now - self.last_time) * 1000,
+                                self.max_frame_time)
+        self.last_time = now
+
+        steps = int(self.accumulator // self.step_ms)
+        self.accumulator -= steps * self.step_ms
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.step_ms
+
+
+class InputLog:
+    """A match recorded as its settings, seed and per-step input states.
+
+    Every physics step appends one InputSampler state record: a byte of
+    direction bits per player, plus two int8 stick axes for players with
+    a controller. Files are a fixed header followed by the records,
+    zlib-compressed by default. replay() feeds them back through
+    Simulation.step(), reproducing the match exactly.
+    """
+    MAGIC = b'RLOG'
+    VERSION = 2
+    # magic, version, flags, seed, player count, game mode, win score,
+    # platform size, powerup interval, step count, arena balls
+    HEADER = struct.Struct('<4sBBqBBHHIIH')
+    # Version 1 logs, from before Arena mode, lack the arena ball count
+    HEADER_V1 = struct.Struct('<4sBBqBBHHII')
+    COMPRESSED = 0x01
+
+    def __init__(self, seed, player_count, game_mode, win_score,
+                 platform_size, powerup_interval, arena_balls):
+        self.seed = seed
+        self.player_count = player_count
+        self.game_mode = game_mode
+        self.win_score = win_score
+        self.platform_size = platform_size
+        self.powerup_interval = powerup_interval
+        self.arena_balls = arena_balls
+        self.records = bytearray()
+        self.steps = 0
+
+    @classmethod
+    def for_simulation(cls, sim):
+        """Start an empty log for a match that has not been stepped yet"""
+        return cls(sim.seed, sim.selected_player_count,
+                   sim.selected_game_mode, sim.selected_win_score,
+                   sim.selected_platform_size, sim.selected_powerup_interval,
+                   sim.selected_arena_balls)
+
+    def record(self, state):
+        """Append the input state used for one physics step"""
+        for bits, x_axis, y_axis in state:
+            self.records.append(bits)
+            if bits & INPUT_HAS_AXES:
+                self.records += struct.pack('bb', x_axis, y_axis)
+        self.steps += 1
+
+    def states(self):
+        """Yield the recorded input state of every step in order"""
+        records = self.records
+        position = 0
+        for _ in range(self.steps):
+            state = []
+            for _ in PLAYER_CONTROLS:
+                bits = records[position]
+                position += 1
+                if bits & INPUT_HAS_AXES:
+                    x_axis, y_axis = struct.unpack_from('bb', records,
+                                                        position)
+                    position += 2
+                    state.append((bits, x_axis, y_axis))
+                else:
+                    state.append((bits, 0, 0))
+            yield tuple(state)
+
+    def save(self, path, compress=True):
+        """Write the log to path and return its size in bytes"""
+        body = zlib.compress(bytes(self.records), 9) if compress \
+            else bytes(self.records)
+        header = self.HEADER.pack(
+            self.MAGIC, self.VERSION, self.COMPRESSED if compress else 0,
+            self.seed, self.player_count, GAME_MODES.index(self.game_mode),
+            self.win_score, self.platform_size, self.powerup_interval,
+            self.steps, self.arena_balls)
+        with open(path, 'wb') as log_file:
+            log_file.write(header + body)
+        return len(header) + len(body)
+
+    @classmethod
+    def load(cls, path):
+        """Read a log written by save()"""
+        with open(path, 'rb') as log_file:
+            data = log_file.read()
+
+        header = cls.HEADER_V1 if data[4:5] == b'\x01' else cls.HEADER
+        (magic, version, flags, seed, player_count, game_mode, win_score,
+         platform_size, powerup_interval, steps,
+         *arena_balls) = header.unpack_from(data)
+        if magic != cls.MAGIC or version not in (1, cls.VERSION):
+            raise ValueError(f"{path} is not a version 1 or "
+                             f"{cls.VERSION} input log")
+
+        log = cls(seed, player_count, GAME_MODES[game_mode], win_score,
+                  platform_size, powerup_interval,
+                  arena_balls[0] if arena_balls else None)
+        body = data[header.size:]
+        log.records = bytearray(
+            zlib.decompress(body) if flags & cls.COMPRESSED else body)
+        log.steps = steps
+        return log
+
+    def replay(self, on_step=None):
+        """Run the recorded match in a fresh Simulation and return it.
+
+        on_step(sim), if given, is called after every step.
+        """
+        sim = Simulation(player_count=self.player_count,
+                         game_mode=self.game_mode, win_score=self.win_score,
+                         platform_size=self.platform_size,
+                         powerup_interval=self.powerup_interval,
+                         seed=self.seed,
+                         arena_balls=self.arena_balls)
+        for state in self.states():
+            sim.step(decode_input_state(state))
+            if on_step is not None:
+                on_step(sim)
+        return sim
+
+
+def save_input_log(input_log):
+    """Write a match's input log into the --record directory"""
+    if input_log is None:
+        return
+    os.makedirs(args.record, exist_ok=True)
+    path = os.path.join(
+        args.record,
+        f"match-{time.strftime('%Y%m%d-%H%M%S')}-{input_log.seed}.rlog")
+    size = input_log.save(path)
+    print(f"Saved {input_log.steps} steps to {path} ({size} bytes)")
+
+
+def end_match(input_log):
+    """Save the match's input log and report input latency if asked"""
+    save_input_log(input_log)
+    if args.input_latency:
+        print(input_sampler.latency_summary())
+
+
+@trace_screen
+def main_game():
+    # Special handling for Co-op and Arena modes
+    if selected_game_mode in COOP_MODES:
+        coop_game()
+        return
+
+    # Start a fresh match
+    sim = Simulation(seed=args.seed)
+    input_log = InputLog.for_simulation(sim) if args.record else None
+    input_sampler.reset_latency()
+    show_ready_message()
+    timestep = FixedTimestep()
+    full_redraw = True
+
+    while True:
+        perf_overlay.start_frame()
+        for event in pygame.event.get():
+            handle_controller_event(event)
+            if event.type == QUIT:
+                end_match(input_log)
+                pygame.quit()
+                sys.exit()
+            if event.type == KEYDOWN and event.key == pygame.K_F3:
+                perf_overlay.toggle()
+            if event.type == KEYDOWN and event.key == pygame.K_F4:
+                tracer.flush()
+
+        # Hold the match while a message is up
+        if update_transitions():
+            draw_transition()
+            timestep.reset()
+            full_redraw = True
+            clock.tick(FPS)
+            continue
+
+        input_sampler.sample(pygame.key.get_pressed())
+        perf_overlay.lap('input')
+        for _ in range(timestep.advance()):
+            input_sampler.consume()
+            if input_log is not None:
+                input_log.record(input_sampler.state)
+            events = sim.step(input_sampler.movement)
+
+            if 'winner' in events:
+                # Convert color name for winner display
+                if sim.winner == 'ai':
+                    winner_name = 'Black'
+                else:
+                    winner_name = sim.winner.capitalize()
+                end_match(input_log)
+                show_winner(winner_name)
+                return
+
+            if 'round_reset' in events:
+                show_ready_message()
+                break
+
+        begin_frame(full_redraw)
+        full_redraw = False
+        draw_game_frame(sim, timestep.alpha)
+        perf_overlay.draw()
+        end_frame()
+        perf_overlay.lap('flip')
+        clock.tick(MAX_RENDER_FPS)
+
+
+def benchmark_broadphase(ball_counts=(4, 14, 50, 100, 200, 500), frames=100):
+    """Print pair checks per frame for all-pairs vs the spatial hash.
+
+    The first table scatters same-size balls over the screen; the second
+    uses the balls of a freshly spawned Arena match, where the players
+    are larger than the AI balls packed around the ring.
+    """
+    def measure(balls):
+        """All-pairs and candidate counts and times for one frame"""
+        count = len(balls)
+        start = time.perf_counter()
+        pairs = [(balls[i], balls[j]) for i in range(count)
+                 for j in range(i + 1, count)]
+        for ball1, ball2 in pairs:
+            math.hypot(ball1.x - ball2.x, ball1.y - ball2.y)
+        all_time = time.perf_counter() - start
+        all_pairs = len(pairs)
+
+        start = time.perf_counter()
+        pairs = collision_pairs(balls)
+        for ball1, ball2 in pairs:
+            math.hypot(ball1.x - ball2.x, ball1.y - ball2.y)
+        return (all_pairs, len(pairs), all_time,
+                time.perf_counter() - start)
+
+    def report(count, totals):
+        all_pairs, candidates, all_time, hash_time = totals
+        print(f"{count:>6} {all_pairs / frames:>10.0f} "
+              f"{candidates / frames:>11.1f} "
+              f"{all_time * 1000 / frames:>8.3f} "
+              f"{hash_time * 1000 / frames:>8.3f}")
+
+    header = (f"{'balls':>6} {'all pairs':>10} {'candidates':>11} "
+              f"{'all ms':>8} {'hash ms':>8}")
+    rng = random.Random(0)
+    print(header)
+    for count in ball_counts:
+        totals = [0, 0, 0, 0]
+        for _ in range(frames):
+            # Scatter balls over the whole screen, as in a large arena
+            balls = [create_ball(rng.uniform(0, WIDTH),
+                                 rng.uniform(0, HEIGHT), AI_COLORS[0])
+                     for _ in range(count)]
+            totals = [t + m for t, m in zip(totals, measure(balls))]
+        report(count, totals)
+
+    print("\nArena spawn (4 players among smaller AI balls)")
+    print(header)
+    for count in ARENA_BALL_COUNTS:
+        balls = Simulation(4, "Arena", seed=0,
+                           arena_balls=count).balls_in_play()
+        totals = [0, 0, 0, 0]
+        for _ in range(frames):
+            totals = [t + m for t, m in zip(totals, measure(balls))]
+        report(len(balls), totals)
+
+
+def benchmark_ball_storage(count=1000, number=200000):
+    """Print memory per ball and field access cost of ball dicts vs Ball"""
+    colors = [DARKER_RED, DARK_RED, RED]
+
+    def measure_memory(make):
+        tracemalloc.start()
+        balls = [make() for _ in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del balls
+        return size / count
+
+    dict_bytes = measure_memory(
+        lambda: dict(create_ball(0, 0, colors).items()))
+    ball_bytes = measure_memory(lambda: create_ball(0, 0, colors))
+    print(f"{'storage':>12} {'bytes/ball':>11} {'ns/update':>10}")
+
+    # One physics update: friction, integration and a flag check
+    ball = create_ball(0, 0, colors)
+    ball_dict = dict(ball.items())
+    cases = (
+        ('dict', dict_bytes, ball_dict,
+         "if not b['frozen']: b['vx'] *= 0.98; b['x'] += b['vx']"),
+        ('Ball', ball_bytes, ball,
+         "if not b.frozen: b.vx *= 0.98; b.x += b.vx"),
+        ('Ball items', ball_bytes, ball,
+         "if not b['frozen']: b['vx'] *= 0.98; b['x'] += b['vx']"),
+    )
+    for name, size, target, statement in cases:
+        elapsed = min(timeit.repeat(statement, globals={'b': target},
+                                    number=number, repeat=5))
+        print(f"{name:>12} {size:>11.0f} {elapsed * 1e9 / number:>10.1f}")
+
+
+def resident_memory():
+    """Resident memory of this process in bytes, or None if unknown"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def benchmark_audio():
+    """Print mixer start-up time and what each sound asset costs to load"""
+    frequency, _, channels = pygame.mixer.get_init()
+    print(f"Mixer start-up: {audio_init_time * 1000:.1f} ms, "
+          f"{frequency} Hz, {channels} channels, buffer {AUDIO_BUFFER} "
+          f"samples ({AUDIO_BUFFER / frequency * 1000:.1f} ms)")
+    print(f"{'asset':>14} {'loaded':>7} {'file KB':>8} {'decoded KB':>11} "
+          f"{'load ms':>8} {'RSS KB':>7}")
+
+    unused_time = unused_bytes = 0
+    for path in ("collision.wav",) + UNUSED_SOUNDS:
+        memory_before = resident_memory()
+        start = time.perf_counter()
+        sound = pygame.mixer.Sound(path)
+        elapsed = time.perf_counter() - start
+        memory_after = resident_memory()
+        decoded = len(sound.get_raw())
+        del sound
+
+        rss = "n/a"
+        if memory_before is not None:
+            rss = f"{(memory_after - memory_before) / 1024:.0f}"
+        loaded = "never" if path in UNUSED_SOUNDS else "eagerly"
+        if path in UNUSED_SOUNDS:
+            unused_time += elapsed
+            unused_bytes += decoded
+        print(f"{path:>14} {loaded:>7} {os.path.getsize(path) / 1024:>8.0f} "
+              f"{decoded / 1024:>11.0f} {elapsed * 1000:>8.2f} {rss:>7}")
+
+    print(f"Loading unused sounds at start-up would add "
+          f"{unused_time * 1000:.2f} ms and {unused_bytes / 1024:.0f} KB")
+
+
+BENCHMARK_REPEAT = 10  # Timed runs per benchmark; the fastest is kept
+BENCHMARK_RUN_TIME = 0.3  # Minimum seconds per timed run
+BENCHMARK_FRAMES = 600  # Frames played by each match scenario
+ARENA_BENCHMARK_FRAMES = 300  # Frames played at each --benchmark-arena size
+
+
+def benchmark_inputs(sim):
+    """Inputs steering every player for the platform centre, circling it"""
+    center = WIDTH / 2
+    inputs = {}
+    for color, ball in sim.active_balls.items():
+        dx = (center - ball.x) / 100
+        dy = (center - ball.y) / 100
+        inputs[color] = (max(-1, min(1, dx - dy / 2)),
+                         max(-1, min(1, dy + dx / 2)))
+    return inputs
+
+
+def benchmark_match(player_count, game_mode, coop_level=1):
+    """Return a function playing up to BENCHMARK_FRAMES of a seeded match.
+
+    Players steer with benchmark_inputs(), so every run sees the same
+    collisions, falls and powerups. The function returns the number of
+    frames played.
+    """
+    def play():
+        sim = Simulation(player_count, game_mode, seed=0,
+                         coop_level=coop_level)
+        for _ in range(BENCHMARK_FRAMES):
+            if {'winner', 'game_over', 'victory'} & set(
+                    sim.step(benchmark_inputs(sim))):
+                break
+        return sim.frame
+    return play
+
+
+def benchmark_arena(ball_counts=ARENA_BALL_COUNTS,
+                    frames=ARENA_BENCHMARK_FRAMES):
+    """Print how each frame phase scales with the Arena ball count.
+
+    Plays a seeded 4-player Arena match of each size for up to frames
+    frames, drawing every frame offscreen (init_display(offscreen=True)
+    first), and prints the mean ms per frame perf_overlay charged to
+    each phase, with the AI balls still in play at the end.
+    """
+    phases = ('ai', 'physics', 'collisions', 'tron', 'render')
+    print(f"{'balls':>6} {'left':>5} " +
+          " ".join(f"{phase:>10}" for phase in phases) + f" {'total':>8}")
+
+    perf_overlay.show(True)  # Time the laps; the overlay is never drawn
+    for count in ball_counts:
+        sim = Simulation(4, "Arena", seed=0, arena_balls=count)
+        perf_overlay.reset()
+        for _ in range(frames):
+            perf_overlay.start_frame()
+            events = sim.step(benchmark_inputs(sim))
+            render_frame(sim)
+            perf_overlay.lap('render')
+            if {'game_over', 'victory'} & set(events):
+                break
+        perf_overlay.start_frame()  # Close the last frame
+
+        means = [perf_overlay.phase_totals[phase] * 1000 /
+                 perf_overlay.phase_frames for phase in phases]
+        print(f"{count:>6} {len(sim.coop_ai_balls):>5} " +
+              " ".join(f"{mean:>10.3f}" for mean in means) +
+              f" {sum(means):>8.3f}")
+    perf_overlay.show(False)
+
+
+def benchmark_setups():
+    """Return (name, setup, is_match) entries for run_benchmarks().
+
+    Each setup binds the match it needs, in the state it was first set up
+    in, and returns the function to time, with balls placed so the interesting path runs on every call: balls
+    overlap, a ball rests against a tron trail, powerups lie out of
+    reach. Match scenarios (is_match) play a whole benchmark_match() and
+    return its frame count, so they are timed per frame.
+    """
+    sim = Simulation(4, "Normal", seed=0)
+    sim.bind()
+    red, blue, orange, purple = (
+        sim.red_ball, sim.blue_ball, sim.orange_ball, sim.purple_ball)
+    for ball in (red, blue, orange, purple):
+        ball.spawn_immunity_end = 0
+
+    # Two overlapping balls
+    red.x, red.y = 400, 400
+    blue.x, blue.y = 420, 400
+
+    # A long tron trail spiralling out from the centre, with orange
+    # resting against one of its segments
+    purple.powerup = 'tron'
+    purple.powerup_end = float('inf')
+    purple.x, purple.y = 400, 400
+    purple.tron_trail = [{'start': (400, 400), 'end': (400, 400),
+                          'color': purple.colors[2]}]
+    for step in range(1, 600):
+        angle = step / 20
+        purple.x = 400 + math.cos(angle) * step / 3
+        purple.y = 400 + math.sin(angle) * step / 3
+        extend_tron_trail(purple)
+    (x1, y1), (x2, y2) = (purple.tron_trail[60]['start'],
+                          purple.tron_trail[60]['end'])
+    orange.x, orange.y = (x1 + x2) / 2 + 5, (y1 + y2) / 2 + 5
+
+    # Powerups in the platform corners, away from red
+    powerups[:] = [spawn_powerup() for _ in range(3)]
+    for powerup, (x, y) in zip(powerups, ((PLATFORM_X + 40, PLATFORM_Y + 40),
+                                          (PLATFORM_X + 40, PLATFORM_Y + 560),
+                                          (PLATFORM_X + 560, PLATFORM_Y + 40))):
+        powerup['x'], powerup['y'] = x, y
+
+    coop = Simulation(4, "Co-op", seed=0, coop_level=10)
+
+    snapshots = {}
+
+    def bound(function, match=sim):
+        def setup():
+            # Every timed run starts from the balls as placed above
+            if match in snapshots:
+                match.restore(snapshots[match])
+            else:
+                snapshots[match] = match.snapshot()
+                match.bind()
+            return function
+        return setup
+
+    def match_frame():
+        match = Simulation(4, "Normal", seed=0)
+        for _ in range(120):
+            match.step()
+        return lambda: render_frame(match)
+
+    def winner_screen():
+        sim.bind()
+        balls = [{'pos': {'x': WIDTH // 2, 'y': HEIGHT // 2},
+                  'vel': {'x': 0.3, 'y': 0.2},
+                  'colors': WINNER_COLORS['Red'], 'elapsed': 0,
+                  'active': True}]
+        while len(balls) < WINNER_MAX_BALLS:
+            update_winner_balls(balls, WINNER_COLORS['Red'], 1, 16)
+
+        def frame():
+            screen.fill(BACKGROUND_COLOR)
+            update_winner_balls(balls, WINNER_COLORS['Red'], 1, 16)
+            draw_winner_text('Red', 2000)
+        return frame
+
+    return [
+        ('apply_physics', bound(lambda: apply_physics(red)), False),
+        ('handle_collision',
+         bound(lambda: handle_collision(red, blue)), False),
+        ('check_tron_trail_collision',
+         bound(lambda: check_tron_trail_collision(orange)), False),
+        ('check_powerup_collision',
+         bound(lambda: check_powerup_collision(red)), False),
+        ('move_ai_ball',
+         bound(lambda: move_ai_ball(sim.ai_ball, red, 0)), False),
+        ('move_ai_ball_coop',
+         bound(lambda: move_ai_ball_coop(coop.coop_ai_balls[0],
+                                         coop.red_ball, 0), coop), False),
+        ('draw_ball', bound(lambda: draw_ball(red)), False),
+        ('draw_text_with_outline',
+         bound(lambda: draw_text_with_outline(
+             "Red: 3", score_font, 20, 20, RED, BLACK)), False),
+        ('normal_match_4_players',
+         lambda: benchmark_match(4, "Normal"), True),
+        ('coop_match_level_10',
+         lambda: benchmark_match(4, "Co-op", coop_level=10), True),
+        ('render_match_frame', match_frame, False),
+        ('winner_screen_120_balls', winner_screen, False),
+    ]
+
+
+def compare_tron_hit_paths():
+    """Return the names of tron hit cases where the NumPy and scalar paths
+    disagree.
+
+    Each case is a ball at (400, 400) with radius 20 and a list of trail
+    segments, some passing through its centre or of zero length.
+    """
+    def trail(*lines):
+        return [{'start': start, 'end': end} for start, end in lines]
+
+    through_centre = ((380, 400), (420, 400))
+    touching = ((380, 410), (420, 410))
+    cases = {
+        'nearest_through_centre': trail(through_centre, touching),
+        'only_through_centre': trail(through_centre),
+        'zero_length': trail(((400, 405), (400, 405)), touching),
+        'touching': trail(((380, 390), (420, 390)), touching),
+        'out_of_reach': trail(((380, 430), (420, 430))),
+    }
+
+    mismatches = []
+    for name, segments in cases.items():
+        expected = nearest_segment_hit(segments, 400, 400, 20)
+        rows = np.array([segment['start'] + segment['end']
+                         for segment in segments], dtype=float)
+        result = segment_hit(rows, 400, 400, 20)
+        if (result is None) != (expected is None) or (
+                result is not None and
+                max(abs(a - b) for a, b in zip(result, expected)) > 1e-9):
+            mismatches.append(name)
+    return mismatches
+
+
+def run_benchmarks(save_path=None, compare_path=None, threshold=25):
+    """Time every benchmark, optionally saving or comparing a baseline.
+
+    Results are seconds per call (per frame for match scenarios), the
+    fastest of BENCHMARK_REPEAT timed runs of at least BENCHMARK_RUN_TIME
+    seconds each, taken in rounds over all benchmarks. Returns the names of benchmarks more than threshold
+    percent slower than the baseline, and of compare_tron_hit_paths()
+    cases the two tron hit paths disagree on.
+    """
+    baseline = {}
+    if compare_path:
+        with open(compare_path) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+    print(f"{'benchmark':>28} {'us/call':>10}" +
+          (f" {'baseline':>10} {'change':>8}" if baseline else ""))
+    runs = []
+    for name, setup, is_match in benchmark_setups():
+        function = setup()
+        calls = 1
+        if is_match:
+            calls = function()  # Frames in one match run
+        number, elapsed = timeit.Timer(function).autorange()
+        number = max(number, math.ceil(number * BENCHMARK_RUN_TIME / elapsed))
+        runs.append((name, setup, number, calls))
+
+    # Each round times every benchmark once, so a slow spell of the
+    # machine costs one round rather than all runs of one benchmark
+    results = dict.fromkeys([name for name, *_ in runs], float('inf'))
+    for _ in range(BENCHMARK_REPEAT):
+        for name, setup, number, calls in runs:
+            # setup() binds the benchmark's match again
+            elapsed = timeit.Timer(setup()).timeit(number)
+            results[name] = min(results[name], elapsed / (number * calls))
+
+    regressions = []
+    for name in results:
+        line = f"{name:>28} {results[name] * 1e6:>10.2f}"
+        if name in baseline:
+            change = (results[name] / baseline[name] - 1) * 100
+            line += f" {baseline[name] * 1e6:>10.2f} {change:>+7.1f}%"
+            if change > threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if save_path:
+        with open(save_path, 'w') as baseline_file:
+            json.dump({'unit': 'seconds per call', 'results': results},
+                      baseline_file, indent=2)
+        print(f"Saved baseline to {save_path}")
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) over {threshold:g}% slower "
+              f"than {compare_path}")
+
+    if np is not None:
+        mismatches = compare_tron_hit_paths()
+        for name in mismatches:
+            print(f"segment_hit and nearest_segment_hit disagree: {name}")
+        regressions += mismatches
+    return regressions
+
+
+def timed_render_frame(render_times):
+    """Return an on_step(sim) that renders a frame, timing it into the list"""
+    def on_step(sim):
+        start = time.perf_counter()
+        render_frame(sim)
+        render_times.append(time.perf_counter() - start)
+    return on_step
+
+
+def report_render_times(render_times):
+    """Print what drawing the frames of a --render run cost"""
+    if not render_times:
+        return
+    total = sum(render_times)
+    print(f"Drew {len(render_times)} frames offscreen in {total:.2f}s "
+          f"(mean {total * 1000 / len(render_times):.2f} ms, "
+          f"max {max(render_times) * 1000:.2f} ms per frame)")
+
+
+def report_match_result(sim):
+    """Print how a headless or replayed match ended"""
+    if sim.winner:
+        print(f"Winner: {sim.winner}")
+    if sim.selected_game_mode == "Co-op":
+        print(f"Co-op level reached: {sim.coop_level}")
+    elif sim.selected_game_mode == "Arena":
+        print(f"AI balls left: {len(sim.coop_ai_balls)} of "
+              f"{sim.selected_arena_balls}")
+    else:
+        print(f"Score: {sim.score}")
+
+
+def run_headless(frames, player_count=1, game_mode="Normal",
+                 seed=None, render=False, arena_balls=None):
+    """Simulate a match without a window and report frames per second.
+
+    With render=True every frame is also drawn offscreen, which needs
+    init_display(offscreen=True) first; simulation and drawing are timed
+    separately.
+    """
+    sim = Simulation(player_count=player_count, game_mode=game_mode,
+                     seed=seed, arena_balls=arena_balls)
+    render_times = []
+    on_step = timed_render_frame(render_times) if render else None
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        events = sim.step()
+        if on_step is not None:
+            on_step(sim)
+        if {'winner', 'game_over', 'victory'} & set(events):
+            break
+    elapsed = time.perf_counter() - start - sum(render_times)
+
+    print(f"Simulated {sim.frame} frames in {elapsed:.2f}s "
+          f"({sim.frame / elapsed:.0f} frames/s), seed {sim.seed}")
+    report_render_times(render_times)
+    report_match_result(sim)
+    return sim
+
+
+def run_replay(path, render=False):
+    """Replay a recorded match without a window and report the result.
+
+    render works as for run_headless().
+    """
+    input_log = InputLog.load(path)
+    render_times = []
+    on_step = timed_render_frame(render_times) if render else None
+
+    start = time.perf_counter()
+    sim = input_log.replay(on_step)
+    elapsed = time.perf_counter() - start - sum(render_times)
+
+    print(f"Replayed {sim.frame} frames in {elapsed:.2f}s "
+          f"({sim.frame / PHYSICS_HZ / elapsed:.0f}x real time), "
+          f"seed {sim.seed}")
+    report_render_times(render_times)
+    report_match_result(sim)
+    return sim
 
 
 def create_win_ball(x, y, vx, vy, colors):
@@ -1153,256 +2709,516 @@ def create_win_ball(x, y, vx, vy, colors):
     }
 
 
+# Ball colors on the winner screen, by winner name
+WINNER_COLORS = {
+    'Red': [DARKER_RED, DARK_RED, RED],
+    'Blue': [DARKER_BLUE, DARK_BLUE, BLUE],
+    'Orange': [DARKER_ORANGE, DARK_ORANGE, ORANGE],
+    'Purple': [DARKER_PLAYER_PURPLE, DARK_PLAYER_PURPLE, PLAYER_PURPLE],
+    'Black': [AI_DARKER_GRAY, AI_DARK_GRAY, AI_GRAY]
+}
+WINNER_MAX_BALLS = 120  # Maximum number of balls
+WINNER_SPAWN_INTERVAL = 1  # Frames between spawns
+WINNER_BOUNCE_SPEED = 0.4  # Speed of balls
+
+
+def update_winner_balls(balls, colors, frame_count, elapsed_time):
+    """Split off a new winner-screen ball when due, then move and draw all"""
+    # Spawn new ball every WINNER_SPAWN_INTERVAL frames
+    if (frame_count % WINNER_SPAWN_INTERVAL == 0 and
+            len(balls) < WINNER_MAX_BALLS):
+        # Pick random active ball to split from
+        active_balls = [b for b in balls if b['active']]
+        if active_balls:
+            parent = match_rng.choice(active_balls)
+            # Create new ball with slightly varied velocity
+            angle = match_rng.uniform(0, 2 * math.pi)
+            new_ball = {
+                'pos': {'x': parent['pos']['x'], 'y': parent['pos']['y']},
+                'vel': {
+                    'x': WINNER_BOUNCE_SPEED * math.cos(angle),
+                    'y': WINNER_BOUNCE_SPEED * math.sin(angle)
+                },
+                'colors': colors,
+                'elapsed': 0,
+                'active': True
+            }
+            balls.append(new_ball)
+
+    # Update and draw all balls
+    for ball in balls:
+        ball['elapsed'] = elapsed_time
+
+        # Update position
+        ball['pos']['x'] += ball['vel']['x'] * ball['elapsed']
+        ball['pos']['y'] += ball['vel']['y'] * ball['elapsed']
+
+        # DVD-style bounce off edges
+        if ball['pos']['x'] - BALL_RADIUS <= 0:
+            ball['pos']['x'] = BALL_RADIUS
+            ball['vel']['x'] = abs(ball['vel']['x'])
+        elif ball['pos']['x'] + BALL_RADIUS >= WIDTH:
+            ball['pos']['x'] = WIDTH - BALL_RADIUS
+            ball['vel']['x'] = -abs(ball['vel']['x'])
+
+        if ball['pos']['y'] - BALL_RADIUS <= 0:
+            ball['pos']['y'] = BALL_RADIUS
+            ball['vel']['y'] = abs(ball['vel']['y'])
+        elif ball['pos']['y'] + BALL_RADIUS >= HEIGHT:
+            ball['pos']['y'] = HEIGHT - BALL_RADIUS
+            ball['vel']['y'] = -abs(ball['vel']['y'])
+
+        # Draw the ball
+        draw_ball(create_ball(
+            ball['pos']['x'], ball['pos']['y'], ball['colors']))
+
+
+def draw_winner_text(winner, shown_for):
+    """Draw the winner, scores and continue prompt shown_for ms in"""
+    if shown_for <= 500:  # Slight delay before showing text
+        return
+
+    winner_color = WINNER_COLORS[winner][2]
+    draw_text_with_outline(
+        f"{winner} Wins!",
+        title_font,
+        WIDTH // 2,
+        HEIGHT // 3,
+        winner_color,
+        BLACK,
+        center=True)
+
+    # Show scores for active players
+    active_balls = get_active_balls()
+    y_pos = HEIGHT // 2
+    for color in active_balls:
+        # Convert color name properly for display
+        if color == 'ai':
+            display_name = 'Black'
+            color_value = WINNER_COLORS['Black'][2]
+        else:
+            display_name = color.capitalize()
+            color_value = WINNER_COLORS[display_name][2]
+
+        draw_text_with_outline(f"{display_name}: {score[color]}",
+                               subtitle_font, WIDTH // 2, y_pos,
+                               color_value, BLACK, center=True)
+        y_pos += 40
+
+    # Show continue prompt
+    if shown_for > 1000:
+        draw_text_with_outline(
+            "Press Enter or Controller Button to Play Again",
+            subtitle_font,
+            WIDTH // 2,
+            HEIGHT * 4 // 5,
+            WHITE,
+            BLACK,
+            center=True)
+
+
+@trace_screen
 def show_winner(winner):
     """Show the winner screen with multiplying DVD-style bouncing balls"""
     waiting = True
     start_time = pygame.time.get_ticks()
     last_time = start_time
 
-    # Set up winning ball colors
-    winner_colors = {
-        'Red': [DARKER_RED, DARK_RED, RED],
-        'Blue': [DARKER_BLUE, DARK_BLUE, BLUE],
-        'Orange': [DARKER_ORANGE, DARK_ORANGE, ORANGE],
-        'Purple': [DARKER_PLAYER_PURPLE, DARK_PLAYER_PURPLE, PLAYER_PURPLE],
-        'Black': [AI_DARKER_GRAY, AI_DARK_GRAY, AI_GRAY]
-    }
-
     # Initialize with a single ball in the middle
     balls = [{
         'pos': {'x': WIDTH // 2, 'y': HEIGHT // 2},
         'vel': {'x': 0.3, 'y': 0.2},
-        'colors': winner_colors[winner],
+        'colors': WINNER_COLORS[winner],
         'elapsed': 0,
         'active': True
     }]
-
-    # Configuration
-    max_balls = 120  # Maximum number of balls
-    spawn_interval = 1  # Frames between spawns
     frame_count = 0
-    bounce_speed = 0.4  # Speed of balls
 
     while waiting:
         current_time = pygame.time.get_ticks()
         elapsed_time = current_time - last_time
-        last_time = current_time
-        frame_count += 1
-
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == KEYDOWN and event.key == K_RETURN:
-                if current_time - start_time > 1000:  # Prevent immediate skip
-                    waiting = False
-
-        # Also allow controller buttons to skip the winner screen
-        if current_time - start_time > 1000:  # Prevent immediate skip
-            for i in range(len(controllers)):
-                if controllers[i].get_button(
-                        0) or controllers[i].get_button(7):  # A or Start button
-                    waiting = False
-                    break
-
-        screen.fill(BACKGROUND_COLOR)
-
-        # Spawn new ball every spawn_interval frames
-        if frame_count % spawn_interval == 0 and len(balls) < max_balls:
-            # Pick random active ball to split from
-            active_balls = [b for b in balls if b['active']]
-            if active_balls:
-                parent = random.choice(active_balls)
-                # Create new ball with slightly varied velocity
-                angle = random.uniform(0, 2 * math.pi)
-                new_ball = {
-                    'pos': {'x': parent['pos']['x'], 'y': parent['pos']['y']},
-                    'vel': {
-                        'x': bounce_speed * math.cos(angle),
-                        'y': bounce_speed * math.sin(angle)
-                    },
-                    'colors': winner_colors[winner],
-                    'elapsed': 0,
-                    'active': True
-                }
-                balls.append(new_ball)
-
-        # Update and draw all balls
-        for ball in balls:
-            ball['elapsed'] = elapsed_time
-
-            # Update position
-            ball['pos']['x'] += ball['vel']['x'] * ball['elapsed']
-            ball['pos']['y'] += ball['vel']['y'] * ball['elapsed']
-
-            # DVD-style bounce off edges
-            if ball['pos']['x'] - BALL_RADIUS <= 0:
-                ball['pos']['x'] = BALL_RADIUS
-                ball['vel']['x'] = abs(ball['vel']['x'])
-            elif ball['pos']['x'] + BALL_RADIUS >= WIDTH:
-                ball['pos']['x'] = WIDTH - BALL_RADIUS
-                ball['vel']['x'] = -abs(ball['vel']['x'])
-
-            if ball['pos']['y'] - BALL_RADIUS <= 0:
-                ball['pos']['y'] = BALL_RADIUS
-                ball['vel']['y'] = abs(ball['vel']['y'])
-            elif ball['pos']['y'] + BALL_RADIUS >= HEIGHT:
-                ball['pos']['y'] = HEIGHT - BALL_RADIUS
-                ball['vel']['y'] = -abs(ball['vel']['y'])
+        last_time = current_time
+        frame_count += 1
 
-            # Draw the ball
-            draw_ball({
-                'x': ball['pos']['x'],
-                'y': ball['pos']['y'],
-                'radius': BALL_RADIUS,
-                'colors': ball['colors'],
-                'powerup': None
-            })
+        for event in pygame.event.get():
+            handle_controller_event(event)
+            if event.type == QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type == KEYDOWN and event.key == K_RETURN:
+                if current_time - start_time > 1000:  # Prevent immediate skip
+                    waiting = False
 
-        # Draw winner text
-        if current_time - start_time > 500:  # Slight delay before showing text
-            winner_color = winner_colors[winner][2]
-            draw_text_with_outline(
-                f"{winner} Wins!",
-                title_font,
-                WIDTH // 2,
-                HEIGHT // 3,
-                winner_color,
-                BLACK,
-                center=True)
+        # Also allow controller buttons to skip the winner screen
+        if current_time - start_time > 1000:  # Prevent immediate skip
+            input_sampler.sample_controllers()
+            if input_sampler.confirm_pressed():  # A or Start button
+                waiting = False
 
-            # Show scores for active players
-            active_balls = get_active_balls()
-            y_pos = HEIGHT // 2
-            for color in active_balls:
-                # Convert color name properly for display
-                if color == 'ai':
-                    display_name = 'Black'
-                    color_value = winner_colors['Black'][2]
-                else:
-                    display_name = color.capitalize()
-                    color_value = winner_colors[display_name][2]
-
-                draw_text_with_outline(f"{display_name}: {score[color]}",
-                                       subtitle_font, WIDTH // 2, y_pos,
-                                       color_value, BLACK, center=True)
-                y_pos += 40
-
-            # Show continue prompt
-            if current_time - start_time > 1000:
-                draw_text_with_outline(
-                    "Press Enter or Controller Button to Play Again",
-                    subtitle_font,
-                    WIDTH // 2,
-                    HEIGHT * 4 // 5,
-                    WHITE,
-                    BLACK,
-                    center=True)
+        screen.fill(BACKGROUND_COLOR)
+        update_winner_balls(balls, WINNER_COLORS[winner], frame_count,
+                            elapsed_time)
+        draw_winner_text(winner, current_time - start_time)
 
         pygame.display.flip()
         clock.tick(FPS)
 
 
+def collision_pairs(balls):
+    """Return the pairs of balls close enough to possibly touch.
+
+    Balls are bucketed into a spatial hash whose cells are one median
+    diameter wide, so a crowd of small Arena balls is not graded by the
+    few larger players. Pairs come back in the same (i, j) order as
+    looping over every pair.
+    """
+    if len(balls) < 2:
+        return []
+
+    radii = [ball.radius for ball in balls]
+    cell_size = 2 * sorted(radii)[len(radii) // 2]
+    return [(balls[i], balls[j]) for i, j in spatial_hash_pairs(
+        [ball.x for ball in balls], [ball.y for ball in balls], radii,
+        cell_size)]
+
+
+def spatial_hash_pairs(xs, ys, radii, cell_size):
+    """Return sorted (i, j) index pairs, i < j, of circles that may touch.
+
+    Each circle goes into every cell cell_size wide that its bounding box
+    covers, so a circle larger than the cells sits in several of them, and
+    circles are paired when they share a cell.
+    """
+    grid = {}
+    for index, (x, y, radius) in enumerate(zip(xs, ys, radii)):
+        left = int((x - radius) // cell_size)
+        right = int((x + radius) // cell_size)
+        top = int((y - radius) // cell_size)
+        bottom = int((y + radius) // cell_size)
+        for cell_x in range(left, right + 1):
+            for cell_y in range(top, bottom + 1):
+                grid.setdefault((cell_x, cell_y), []).append(index)
+
+    candidates = set()
+    for indices in grid.values():
+        if len(indices) > 1:
+            # Indices were appended in order, so every pair has i < j
+            candidates.update(itertools.combinations(indices, 2))
+    return sorted(candidates)
+
+
 def handle_collision(ball1, ball2):
     """Handle collision between two balls"""
-    current_time = pygame.time.get_ticks()
+    current_time = get_ticks()
 
     # Skip collision if either ball has spawn immunity
-    if (ball1.get('spawn_immunity_end', 0) > current_time or
-            ball2.get('spawn_immunity_end', 0) > current_time):
+    if (ball1.spawn_immunity_end > current_time or
+            ball2.spawn_immunity_end > current_time):
         return
 
-    dx = ball1['x'] - ball2['x']
-    dy = ball1['y'] - ball2['y']
-    dist = (dx**2 + dy**2)**0.5
+    dx = ball1.x - ball2.x
+    dy = ball1.y - ball2.y
+    reach = ball1.radius + ball2.radius
+    dist_squared = dx * dx + dy * dy
 
-    if dist < ball1['radius'] + ball2['radius']:
-        overlap = (ball1['radius'] + ball2['radius']) - dist
+    # Only pay for the square root once the balls actually overlap
+    if dist_squared < reach * reach:
+        dist = math.sqrt(dist_squared)
+        overlap = (ball1.radius + ball2.radius) - dist
+
+        # How fast the balls were closing in, for the collision sound
+        impact = 0
+        if dist:
+            impact = ((ball2.vx - ball1.vx) * dx +
+                      (ball2.vy - ball1.vy) * dy) / dist
 
         # Calculate knockback multiplier based on powerups
         knockback1 = 0.05  # knockback applied to ball1
         knockback2 = 0.05  # knockback applied to ball2
 
         # Check for heavy hit
-        if ball1.get('heavy_hit', False):
+        if ball1.heavy_hit:
             knockback1 = 0  # Make ball1 immune (like shield)
             knockback2 *= 5  # Reduced from 7 to 5 for more balanced force
-            ball2['hit_flash_start'] = pygame.time.get_ticks()
-            ball1['heavy_hit'] = False  # Consume the heavy hit
-            ball1['powerup'] = None  # Remove powerup
-        elif ball2.get('heavy_hit', False):
+            ball2.hit_flash_start = get_ticks()
+            ball1.heavy_hit = False  # Consume the heavy hit
+            ball1.powerup = None  # Remove powerup
+        elif ball2.heavy_hit:
             knockback2 = 0  # Make ball2 immune (like shield)
             knockback1 *= 5  # Reduced from 7 to 5 for more balanced force
-            ball1['hit_flash_start'] = pygame.time.get_ticks()
-            ball2['heavy_hit'] = False  # Consume the heavy hit
-            ball2['powerup'] = None  # Remove powerup
+            ball1.hit_flash_start = get_ticks()
+            ball2.heavy_hit = False  # Consume the heavy hit
+            ball2.powerup = None  # Remove powerup
 
         # Modify knockback based on powerups
-        if ball1['powerup'] == 'grow':
+        if ball1.powerup == 'grow':
             knockback2 *= 2
-        if ball2['powerup'] == 'grow':
+        if ball2.powerup == 'grow':
             knockback1 *= 2
 
         # Shield makes the ball immune to knockback
-        if ball1['powerup'] == 'shield':
+        if ball1.powerup == 'shield':
             knockback1 = 0
-        if ball2['powerup'] == 'shield':
+        if ball2.powerup == 'shield':
             knockback2 = 0
 
         # Apply knockback to both balls
-        ball1['vx'] += dx * overlap * knockback1
-        ball1['vy'] += dy * overlap * knockback1
-        ball2['vx'] -= dx * overlap * knockback2
-        ball2['vy'] -= dy * overlap * knockback2
+        ball1.vx += dx * overlap * knockback1
+        ball1.vy += dy * overlap * knockback1
+        ball2.vx -= dx * overlap * knockback2
+        ball2.vy -= dy * overlap * knockback2
 
         # Track who hit whom
-        if knockback2 > 0 or ball1.get(
-                'heavy_hit', False):  # If ball1 affected ball2
-            ball2['last_hit_by'] = ball1
-        if knockback1 > 0 or ball2.get(
-                'heavy_hit', False):  # If ball2 affected ball1
-            ball1['last_hit_by'] = ball2
+        if knockback2 > 0 or ball1.heavy_hit:  # If ball1 affected ball2
+            ball2.last_hit_by = ball1
+        if knockback1 > 0 or ball2.heavy_hit:  # If ball2 affected ball1
+            ball1.last_hit_by = ball2
 
-        collision_sound.play()
+        collision_sounds.play((id(ball1), id(ball2)), impact, current_time)
 
 
 def is_off_platform(ball):
     """Check if a ball is off the platform"""
-    return (ball['x'] - ball['radius'] > PLATFORM_X + PLATFORM_SIZE or
-            ball['x'] + ball['radius'] < PLATFORM_X or
-            ball['y'] - ball['radius'] > PLATFORM_Y + PLATFORM_SIZE or
-            ball['y'] + ball['radius'] < PLATFORM_Y)
+    return (ball.x - ball.radius > PLATFORM_X + PLATFORM_SIZE or
+            ball.x + ball.radius < PLATFORM_X or
+            ball.y - ball.radius > PLATFORM_Y + PLATFORM_SIZE or
+            ball.y + ball.radius < PLATFORM_Y)
 
 
 def draw_platform():
-    """Draw the platform."""
+    """Draw the background and platform."""
+    screen.blit(get_background(PLATFORM_SIZE), (0, 0))
+
+
+@functools.lru_cache(maxsize=len(PLATFORM_SIZES))
+def get_background(platform_size):
+    """Background fill with the platform composited on, per platform size"""
+    background = pygame.Surface((WIDTH, HEIGHT))
+    background.fill(BACKGROUND_COLOR)
     pygame.draw.rect(
-        screen,
+        background,
         GRAY,
-        (PLATFORM_X,
-         PLATFORM_Y,
-         PLATFORM_SIZE,
-         PLATFORM_SIZE))
+        ((WIDTH - platform_size) // 2,
+         (HEIGHT - platform_size) // 2,
+         platform_size,
+         platform_size))
+
+    if pygame.display.get_surface() is not None:
+        background = background.convert()
+    return background
+
+
+def mark_dirty(rect):
+    """Record an area drawn during a game frame for dirty-rect updates"""
+    if recording_dirty_rects:
+        dirty_rects.append(rect)
+    return rect
+
+
+def begin_frame(full_redraw=False):
+    """Clear the screen for a new game frame.
+
+    With dirty-rect rendering only the areas drawn last frame are restored
+    from the background; full_redraw repaints everything, e.g. after a
+    message screen has covered the window.
+    """
+    global dirty_rects, previous_dirty_rects, recording_dirty_rects
+    if dirty_rect_rendering and not full_redraw:
+        background = get_background(PLATFORM_SIZE)
+        for rect in dirty_rects:
+            screen.blit(background, rect, rect)
+        previous_dirty_rects = dirty_rects
+    else:
+        draw_platform()
+        previous_dirty_rects = [screen.get_rect()]
+
+    dirty_rects = []
+    recording_dirty_rects = True
+
+
+def end_frame():
+    """Show the finished game frame"""
+    global recording_dirty_rects
+    recording_dirty_rects = False
+    if frame_capture is not None:
+        frame_capture.capture(screen)
+    if dirty_rect_rendering:
+        # Erased areas from last frame plus everything drawn this frame
+        pygame.display.update(previous_dirty_rects + dirty_rects)
+    else:
+        pygame.display.flip()
+
+
+# Frame phases shown on the performance overlay, in frame order
+PERF_PHASES = ('input', 'ai', 'physics', 'collisions', 'tron', 'render',
+               'overlay', 'flip', 'idle')
+PERF_WINDOW = 240  # Frames of history for percentiles and the graph
+PERF_REFRESH_MS = 250  # How often the overlay's contents are redrawn
+PERF_GRAPH_HEIGHT = 60
+
+
+class PerfOverlay:
+    """Frame time and per-phase breakdown drawn over a match, toggled with F3.
+
+    The game loops and Simulation call lap(phase) as each phase of a frame
+    ends, charging the time since the previous lap to that phase and,
+    when tracing, recording it as a span. Unless the overlay is showing
+    or a trace is being recorded, a lap returns at once. Frame times go
+    into a PERF_WINDOW ring buffer for FPS, percentiles and the graph.
+
+    The overlay's own surface is only redrawn every PERF_REFRESH_MS and
+    is otherwise one blit per frame. That cost is reported as the
+    'overlay' phase rather than hidden in 'render'.
+    """
+
+    def __init__(self):
+        self.visible = False
+        self.timing = False  # Showing or tracing
+        self.frame_times = [0.0] * PERF_WINDOW  # Seconds, ring buffer
+        self.surface = None
+        self.reset()
+
+    def reset(self):
+        """Forget all timings"""
+        self.frame_index = 0
+        self.frame_count = 0
+        self.frame_start = None
+        self.last_lap = None
+        self.phase_totals = dict.fromkeys(PERF_PHASES, 0.0)
+        self.phase_frames = 0
+        self.phase_means = dict.fromkeys(PERF_PHASES, 0.0)
+        self.refreshed_at = None
+
+    def show(self, visible):
+        """Show or hide the overlay"""
+        self.visible = visible
+        self.timing = visible or tracer.enabled
+        self.reset()
+
+    def toggle(self):
+        """Show the overlay if hidden, otherwise hide it"""
+        self.show(not self.visible)
+
+    def lap(self, phase):
+        """Charge the time since the previous lap to phase"""
+        if not self.timing:
+            return
+        now = time.perf_counter()
+        if self.last_lap is not None:
+            self.phase_totals[phase] += now - self.last_lap
+            if tracer.enabled:
+                tracer.span(phase, 'frame', self.last_lap, now)
+        self.last_lap = now
+
+    def start_frame(self):
+        """Begin a frame; time since the last frame's final lap was idle"""
+        if not self.timing:
+            return
+        self.lap('idle')
+        if self.frame_start is not None:
+            self.frame_times[self.frame_index] = (
+                self.last_lap - self.frame_start)
+            self.frame_index = (self.frame_index + 1) % PERF_WINDOW
+            self.frame_count = min(self.frame_count + 1, PERF_WINDOW)
+            self.phase_frames += 1
+            if tracer.enabled:
+                tracer.span('frame', 'frame', self.frame_start,
+                            self.last_lap)
+        self.frame_start = self.last_lap
+
+    def draw(self):
+        """Draw the overlay as the last thing in a game frame"""
+        self.lap('render')
+        if not self.visible:
+            return
+
+        now = pygame.time.get_ticks()
+        if (self.refreshed_at is None or
+                now - self.refreshed_at >= PERF_REFRESH_MS):
+            if self.phase_frames:
+                for phase in PERF_PHASES:
+                    self.phase_means[phase] = (
+                        self.phase_totals[phase] / self.phase_frames)
+                    self.phase_totals[phase] = 0.0
+                self.phase_frames = 0
+            self.surface = self.render()
+            self.refreshed_at = now
+
+        mark_dirty(screen.blit(self.surface, (10, 50)))
+        self.lap('overlay')
+
+    def render(self):
+        """Draw FPS, percentiles, phase bars and the frame graph"""
+        line_height = controller_font.get_linesize()
+        width = 250
+        height = (line_height * (len(PERF_PHASES) + 2) +
+                  PERF_GRAPH_HEIGHT + 15)
+        # Opaque, so the per-frame blit is a plain copy
+        surface = pygame.Surface((width, height))
+        surface.fill(DARK_GRAY)
+        budget = 1 / FPS  # Frame time a 60 Hz display allows
+
+        recent = sorted(self.frame_times[:self.frame_count])
+        if recent:
+            def percentile(fraction):
+                return recent[int(fraction * (len(recent) - 1))] * 1000
+            mean = sum(recent) / len(recent)
+            fps = f"{1 / mean:.0f} FPS, frame times in ms:"
+            percentiles = (f"p50 {percentile(0.5):.1f}  "
+                           f"p95 {percentile(0.95):.1f}  "
+                           f"p99 {percentile(0.99):.1f}")
+        else:
+            fps, percentiles = "Measuring...", ""
+        surface.blit(controller_font.render(fps, True, WHITE), (5, 5))
+        surface.blit(controller_font.render(percentiles, True, WHITE),
+                     (5, 5 + line_height))
+
+        # One bar per phase, full width at a whole frame budget
+        y = 5 + line_height * 2
+        for phase in PERF_PHASES:
+            phase_time = self.phase_means[phase]
+            bar = min(1.0, phase_time / budget) * (width - 150)
+            pygame.draw.rect(surface, GREEN, (140, y + 4, bar,
+                                              line_height - 8))
+            surface.blit(controller_font.render(phase, True, WHITE), (5, y))
+            surface.blit(controller_font.render(
+                f"{phase_time * 1000:.2f}", True, WHITE), (90, y))
+            y += line_height
+
+        # Frame times, oldest on the left, against the 60 Hz budget line
+        graph_top = y + 5
+        budget_y = graph_top + PERF_GRAPH_HEIGHT // 2
+        pygame.draw.line(surface, YELLOW, (5, budget_y),
+                         (width - 5, budget_y))
+        if self.frame_count > 1:
+            step = (width - 10) / (PERF_WINDOW - 1)
+            oldest = (self.frame_index - self.frame_count) % PERF_WINDOW
+            points = []
+            for i in range(self.frame_count):
+                frame_time = self.frame_times[(oldest + i) % PERF_WINDOW]
+                scaled = min(frame_time / (2 * budget), 1.0)
+                points.append((5 + i * step,
+                               graph_top + PERF_GRAPH_HEIGHT * (1 - scaled)))
+            pygame.draw.lines(surface, WHITE, False, points)
+        return surface.convert()
+
+
+perf_overlay = PerfOverlay()
 
 
 def draw_ball(ball):
     """Draw a ball with a glossy reflective look and trail effect if shielded."""
-    x, y = int(ball['x']), int(ball['y'])
-    radius = int(ball['radius'])
-    current_time = pygame.time.get_ticks()
-
-    # Initialize trail if it doesn't exist
-    if 'trail' not in ball:
-        ball['trail'] = []
+    x, y = int(ball.x), int(ball.y)
+    radius = int(ball.radius)
+    current_time = get_ticks()
 
     # Draw trail if ball has shield powerup or was recently hit
-    if ball['powerup'] == 'shield' or ball.get(
-            'hit_flash_start', 0) > current_time - 1000:
-        if not ball['trail'] or math.sqrt(
-            (x - ball['trail'][-1]['x'])**2 +
-                (y - ball['trail'][-1]['y'])**2) > TRAIL_SPACING:
+    if ball.powerup == 'shield' or ball.hit_flash_start > current_time - 1000:
+        if not ball.trail or math.sqrt(
+            (x - ball.trail[-1]['x'])**2 +
+                (y - ball.trail[-1]['y'])**2) > TRAIL_SPACING:
 
-            ball['trail'].append({
+            ball.trail.append({
                 'x': x,
                 'y': y,
                 'time': current_time,
@@ -1410,11 +3226,11 @@ def draw_ball(ball):
             })
 
             # Remove old trail positions
-            while len(ball['trail']) > TRAIL_LENGTH:
-                ball['trail'].pop(0)
+            while len(ball.trail) > TRAIL_LENGTH:
+                ball.trail.pop(0)
 
         # Draw and update each ghost in the trail
-        for ghost in ball['trail'][:-
+        for ghost in ball.trail[:-
                                    1]:  # Don't draw ghost at current position
             # Calculate how long this ghost has existed
             age = (current_time - ghost['time']) / 1000.0  # Convert to seconds
@@ -1428,7 +3244,7 @@ def draw_ball(ball):
                     (radius * 2 + 6, radius * 2 + 6), pygame.SRCALPHA)
 
                 # Draw the trail segment with transparency
-                for j, color in enumerate(ball['colors']):
+                for j, color in enumerate(ball.colors):
                     # Convert color to include alpha
                     color_with_alpha = (*color, alpha)
                     pygame.draw.circle(trail_surface, color_with_alpha,
@@ -1436,44 +3252,122 @@ def draw_ball(ball):
                                        radius - j * 5)
 
                 # Draw the trail surface
-                screen.blit(trail_surface,
-                            (ghost['x'] - radius - 3, ghost['y'] - radius - 3))
+                mark_dirty(screen.blit(
+                    trail_surface,
+                    (ghost['x'] - radius - 3, ghost['y'] - radius - 3)))
     else:
         # Clear trail when not shielded
-        ball['trail'] = []
+        ball.trail = []
 
     # Draw shield effect
-    if ball['powerup'] == 'shield':
-        pygame.draw.circle(screen, PURPLE, (x, y), radius + 5, 2)
+    if ball.powerup == 'shield':
+        mark_dirty(pygame.draw.circle(screen, PURPLE, (x, y), radius + 5, 2))
 
-    # Draw outline
-    if ball.get('frozen', False):
-        pygame.draw.circle(screen, LIGHT_BLUE, (x, y), radius + 3)
-    elif ball.get('heavy_hit', False):
+    # Pick outline
+    if ball.frozen:
+        outline_color = LIGHT_BLUE
+    elif ball.heavy_hit:
         # Flash outline between black and white
         flash = (math.sin(current_time * 0.02) + 1) / \
             2  # Faster pulse than powerup
         outline_color = interpolate_color(BLACK, WHITE, flash)
-        pygame.draw.circle(screen, outline_color, (x, y), radius + 3)
     else:
-        pygame.draw.circle(screen, BLACK, (x, y), radius + 3)
+        outline_color = BLACK
+
+    # Draw the outlined, glossy ball from the sprite cache
+    sprite = get_ball_sprite(tuple(ball.colors), radius, outline_color)
+    mark_dirty(screen.blit(sprite, (x - radius - 3, y - radius - 3)))
+
+    # Draw tron trail if active
+    if ball.powerup == 'tron' and ball.tron_trail:
+        for segment in ball.tron_trail:
+            mark_dirty(pygame.draw.line(
+                screen, segment['color'], segment['start'], segment['end'], int(
+                    ball.radius)))  # Changed to radius instead of diameter
+
+
+@functools.lru_cache(maxsize=BALL_SPRITE_CACHE_SIZE)
+def get_ball_sprite(colors, radius, outline_color):
+    """Pre-render an outlined ball; draw_ball blits it at (x - r - 3, y - r - 3)
 
-    # Draw the main ball
-    for i, color in enumerate(ball['colors']):
-        pygame.draw.circle(screen, color, (x, y), radius - i * 5)
+    Cached per (colors, radius, outline color), so grown and shrunk balls
+    simply get their own entries.
+    """
+    size = (radius + 3) * 2
+    center = (radius + 3, radius + 3)
+    sprite = pygame.Surface((size, size))
+    sprite.fill(SPRITE_COLORKEY)
+
+    pygame.draw.circle(sprite, outline_color, center, radius + 3)
+    for i, color in enumerate(colors):
+        pygame.draw.circle(sprite, color, center, radius - i * 5)
     pygame.draw.circle(
-        screen,
+        sprite,
         WHITE,
-        (x - radius // 3,
-         y - radius // 3),
+        (center[0] - radius // 3,
+         center[1] - radius // 3),
         radius // 4)  # Highlight
 
-    # Draw tron trail if active
-    if ball['powerup'] == 'tron' and ball['tron_trail']:
-        for segment in ball['tron_trail']:
-            pygame.draw.line(
-                screen, segment['color'], segment['start'], segment['end'], int(
-                    ball['radius']))  # Changed to radius instead of diameter
+    # Every drawn pixel is opaque, so a run-length encoded color key blits
+    # much faster than per-pixel alpha
+    if pygame.display.get_surface() is not None:
+        sprite = sprite.convert()
+    sprite.set_colorkey(SPRITE_COLORKEY, pygame.RLEACCEL)
+    return sprite
+
+
+def draw_game_frame(sim, alpha):
+    """Draw the match, alpha of the way from its last step to the current"""
+    draw_powerups()
+
+    if selected_game_mode in COOP_MODES:
+        # Draw level indicator for Co-op mode, AI left for Arena
+        if selected_game_mode == "Arena":
+            status_text = f"AI Balls: {len(coop_ai_balls)}"
+        else:
+            status_text = f"Level {coop_level}"
+        draw_text_with_outline(
+            status_text,
+            subtitle_font,
+            WIDTH // 2,
+            20,
+            WHITE,
+            BLACK,
+            center=True)
+
+        # Draw all active players
+        for ball in sim.active_balls.values():
+            draw_ball_interpolated(ball, sim, alpha)
+
+        # Draw all AI balls
+        for ai_ball in coop_ai_balls:
+            draw_ball_interpolated(ai_ball, sim, alpha)
+
+        # Draw scores (for Co-op, just show active/dead status)
+        draw_coop_status()
+    else:
+        for ball in sim.active_balls.values():
+            draw_ball_interpolated(ball, sim, alpha)
+        draw_scores()
+
+    # Draw controller indicators if controllers are connected
+    if controller_slots:
+        draw_controller_indicators()
+
+
+def render_frame(sim):
+    """Draw and finish one whole game frame of the match as it stands"""
+    begin_frame(True)
+    draw_game_frame(sim, 1.0)
+    end_frame()
+
+
+def draw_ball_interpolated(ball, sim, alpha):
+    """Draw a ball part way between its last two physics positions"""
+    x, y = ball.x, ball.y
+    ball.x, ball.y = sim.draw_position(ball, alpha)
+    draw_ball(ball)
+    ball.x, ball.y = x, y
 
 
 def draw_scores():
@@ -1532,8 +3426,22 @@ def draw_scores():
 
 
 def get_active_balls():
-    """Return dictionary of active balls based on player count and game mode"""
-    if selected_game_mode == "Co-op":
+    """Return dictionary of active balls based on player count and game mode.
+
+    The dict comes from active_roster and is shared between callers; copy
+    it before adding or removing balls.
+    """
+    return active_roster.refresh().balls
+
+
+def get_active_ball_list():
+    """Return the active balls as a shared list, in get_active_balls order"""
+    return active_roster.refresh().ball_list
+
+
+def build_active_balls():
+    """Build the dictionary of active balls for the current settings"""
+    if selected_game_mode in COOP_MODES:
         # In Co-op mode, only return human players that aren't eliminated
         balls = {}
         if 'red' not in eliminated_players:
@@ -1555,13 +3463,43 @@ def get_active_balls():
     return balls
 
 
+class Roster:
+    """Cached result of build_active_balls() with an ordered ball list.
+
+    Rebuilt when the selected player count or game mode differ from the
+    ones it was built for, or after invalidate(), which is called whenever
+    players are eliminated or brought back and when a match's ball
+    objects are replaced.
+    """
+
+    def __init__(self):
+        self.settings = None
+        self.balls = {}
+        self.ball_list = []
+
+    def invalidate(self):
+        self.settings = None
+
+    def refresh(self):
+        settings = (selected_game_mode, selected_player_count)
+        if settings != self.settings:
+            self.balls = build_active_balls()
+            self.ball_list = list(self.balls.values())
+            self.settings = settings
+        return self
+
+
+# Roster for the module-level balls; each Simulation binds its own
+active_roster = Roster()
+
+
 def move_ai_ball(ai_ball, player_ball, current_time):
     """Control AI ball movement"""
-    if ai_ball.get('frozen', False):
+    if ai_ball.frozen:
         return
 
-    dx = player_ball['x'] - ai_ball['x']
-    dy = player_ball['y'] - ai_ball['y']
+    dx = player_ball.x - ai_ball.x
+    dy = player_ball.y - ai_ball.y
     dist_to_player = math.sqrt(dx * dx + dy * dy)
 
     # Initialize movement vector
@@ -1569,15 +3507,15 @@ def move_ai_ball(ai_ball, player_ball, current_time):
     move_y = 0
 
     # Platform edge awareness
-    dist_to_left = ai_ball['x'] - PLATFORM_X
-    dist_to_right = PLATFORM_X + PLATFORM_SIZE - ai_ball['x']
-    dist_to_top = ai_ball['y'] - PLATFORM_Y
-    dist_to_bottom = PLATFORM_Y + PLATFORM_SIZE - ai_ball['y']
+    dist_to_left = ai_ball.x - PLATFORM_X
+    dist_to_right = PLATFORM_X + PLATFORM_SIZE - ai_ball.x
+    dist_to_top = ai_ball.y - PLATFORM_Y
+    dist_to_bottom = PLATFORM_Y + PLATFORM_SIZE - ai_ball.y
 
     # Strong edge avoidance - increased margin and force when player has
     # powerup
-    platform_margin = AI_PLATFORM_MARGIN * (2 if player_ball['powerup'] else 1)
-    edge_force = 4.0 if player_ball['powerup'] else 3.0
+    platform_margin = AI_PLATFORM_MARGIN * (2 if player_ball.powerup else 1)
+    edge_force = 4.0 if player_ball.powerup else 3.0
 
     if dist_to_left < platform_margin:
         move_x += BALL_SPEED * AI_SPEED * edge_force
@@ -1589,7 +3527,7 @@ def move_ai_ball(ai_ball, player_ball, current_time):
         move_y -= BALL_SPEED * AI_SPEED * edge_force
 
     # Check if player has powerup
-    player_has_powerup = player_ball['powerup'] is not None
+    player_has_powerup = player_ball.powerup is not None
 
     if player_has_powerup and dist_to_player < 350:  # Increased detection range
         # Calculate center of platform
@@ -1597,8 +3535,8 @@ def move_ai_ball(ai_ball, player_ball, current_time):
         platform_center_y = PLATFORM_Y + PLATFORM_SIZE / 2
 
         # Vector from AI to platform center
-        to_center_x = platform_center_x - ai_ball['x']
-        to_center_y = platform_center_y - ai_ball['y']
+        to_center_x = platform_center_x - ai_ball.x
+        to_center_y = platform_center_y - ai_ball.y
         to_center_length = math.sqrt(to_center_x**2 + to_center_y**2)
 
         if to_center_length > 0:
@@ -1624,7 +3562,7 @@ def move_ai_ball(ai_ball, player_ball, current_time):
                       center_weight) * BALL_SPEED * AI_SPEED * 2
 
             # Extra evasion for dangerous powerups
-            if player_ball['powerup'] in ['heavy', 'grow', 'tron']:
+            if player_ball.powerup in ['heavy', 'grow', 'tron']:
                 move_x *= 1.8
                 move_y *= 1.8
     else:
@@ -1634,8 +3572,8 @@ def move_ai_ball(ai_ball, player_ball, current_time):
         closest_powerup_dist = float('inf')
 
         for powerup in powerups:
-            px = powerup['x'] - ai_ball['x']
-            py = powerup['y'] - ai_ball['y']
+            px = powerup['x'] - ai_ball.x
+            py = powerup['y'] - ai_ball.y
             powerup_dist = math.sqrt(px * px + py * py)
 
             if powerup_dist < closest_powerup_dist:
@@ -1643,24 +3581,24 @@ def move_ai_ball(ai_ball, player_ball, current_time):
                 closest_powerup = powerup
 
         # Decide whether to chase powerup or player
-        if closest_powerup and random.random() < AI_POWERUP_PRIORITY:
+        if closest_powerup and match_rng.random() < AI_POWERUP_PRIORITY:
             # Go for powerup with speed based on distance
             speed_multiplier = min(1.5, 0.5 + (closest_powerup_dist / 400))
 
-            if closest_powerup['x'] > ai_ball['x']:
+            if closest_powerup['x'] > ai_ball.x:
                 move_x += BALL_SPEED * AI_SPEED * speed_multiplier
-            if closest_powerup['x'] < ai_ball['x']:
+            if closest_powerup['x'] < ai_ball.x:
                 move_x -= BALL_SPEED * AI_SPEED * speed_multiplier
-            if closest_powerup['y'] > ai_ball['y']:
+            if closest_powerup['y'] > ai_ball.y:
                 move_y += BALL_SPEED * AI_SPEED * speed_multiplier
-            if closest_powerup['y'] < ai_ball['y']:
+            if closest_powerup['y'] < ai_ball.y:
                 move_y -= BALL_SPEED * AI_SPEED * speed_multiplier
         else:
             # Chase player aggressively
-            predicted_x = player_ball['x'] + player_ball['vx'] * 5
-            predicted_y = player_ball['y'] + player_ball['vy'] * 5
-            dx_pred = predicted_x - ai_ball['x']
-            dy_pred = predicted_y - ai_ball['y']
+            predicted_x = player_ball.x + player_ball.vx * 5
+            predicted_y = player_ball.y + player_ball.vy * 5
+            dx_pred = predicted_x - ai_ball.x
+            dy_pred = predicted_y - ai_ball.y
 
             if dx_pred > 0:
                 move_x += BALL_SPEED * AI_SPEED
@@ -1672,20 +3610,20 @@ def move_ai_ball(ai_ball, player_ball, current_time):
                 move_y -= BALL_SPEED * AI_SPEED
 
     # Apply movement with increased acceleration
-    ai_ball['vx'] += move_x * AI_ACCELERATION
-    ai_ball['vy'] += move_y * AI_ACCELERATION
+    ai_ball.vx += move_x * AI_ACCELERATION
+    ai_ball.vy += move_y * AI_ACCELERATION
 
 
 def move_ai_ball_coop(ai_ball, player_ball, current_time):
     """AI movement logic specifically for Co-op mode, modified from move_ai_ball"""
-    if ai_ball.get('frozen', False):
+    if ai_ball.frozen:
         return
 
     # Get speed multiplier based on level
-    speed_mult = ai_ball.get('speed_multiplier', 1.0)
+    speed_mult = ai_ball.speed_multiplier
 
-    dx = player_ball['x'] - ai_ball['x']
-    dy = player_ball['y'] - ai_ball['y']
+    dx = player_ball.x - ai_ball.x
+    dy = player_ball.y - ai_ball.y
     dist_to_player = math.sqrt(dx * dx + dy * dy)
 
     # Initialize movement vector
@@ -1693,10 +3631,10 @@ def move_ai_ball_coop(ai_ball, player_ball, current_time):
     move_y = 0
 
     # Platform edge awareness
-    dist_to_left = ai_ball['x'] - PLATFORM_X
-    dist_to_right = PLATFORM_X + PLATFORM_SIZE - ai_ball['x']
-    dist_to_top = ai_ball['y'] - PLATFORM_Y
-    dist_to_bottom = PLATFORM_Y + PLATFORM_SIZE - ai_ball['y']
+    dist_to_left = ai_ball.x - PLATFORM_X
+    dist_to_right = PLATFORM_X + PLATFORM_SIZE - ai_ball.x
+    dist_to_top = ai_ball.y - PLATFORM_Y
+    dist_to_bottom = PLATFORM_Y + PLATFORM_SIZE - ai_ball.y
 
     # Edge avoidance
     platform_margin = AI_PLATFORM_MARGIN
@@ -1712,11 +3650,11 @@ def move_ai_ball_coop(ai_ball, player_ball, current_time):
         move_y -= BALL_SPEED * AI_SPEED * edge_force
 
     # Player has powerup - be more cautious
-    player_has_powerup = player_ball['powerup'] is not None
+    player_has_powerup = player_ball.powerup is not None
 
     if player_has_powerup and dist_to_player < 300:
         # Be more cautious around powered-up players
-        if player_ball['powerup'] in ['heavy', 'grow', 'tron']:
+        if player_ball.powerup in ['heavy', 'grow', 'tron']:
             # These are dangerous - run away
             if dist_to_player > 0:
                 move_x -= (dx / dist_to_player) * BALL_SPEED * \
@@ -1729,8 +3667,8 @@ def move_ai_ball_coop(ai_ball, player_ball, current_time):
             closest_powerup_dist = float('inf')
 
             for powerup in powerups:
-                px = powerup['x'] - ai_ball['x']
-                py = powerup['y'] - ai_ball['y']
+                px = powerup['x'] - ai_ball.x
+                py = powerup['y'] - ai_ball.y
                 powerup_dist = math.sqrt(px * px + py * py)
 
                 if powerup_dist < closest_powerup_dist:
@@ -1739,13 +3677,13 @@ def move_ai_ball_coop(ai_ball, player_ball, current_time):
 
             if closest_powerup:
                 # Go for closest powerup
-                if closest_powerup['x'] > ai_ball['x']:
+                if closest_powerup['x'] > ai_ball.x:
                     move_x += BALL_SPEED * AI_SPEED * speed_mult
-                if closest_powerup['x'] < ai_ball['x']:
+                if closest_powerup['x'] < ai_ball.x:
                     move_x -= BALL_SPEED * AI_SPEED * speed_mult
-                if closest_powerup['y'] > ai_ball['y']:
+                if closest_powerup['y'] > ai_ball.y:
                     move_y += BALL_SPEED * AI_SPEED * speed_mult
-                if closest_powerup['y'] < ai_ball['y']:
+                if closest_powerup['y'] < ai_ball.y:
                     move_y -= BALL_SPEED * AI_SPEED * speed_mult
             else:
                 # No powerups, circle the player
@@ -1758,13 +3696,13 @@ def move_ai_ball_coop(ai_ball, player_ball, current_time):
     else:
         # Normal pursuit behavior
         # Check for powerups occasionally
-        if random.random() < 0.1:  # 10% chance to look for powerups
+        if match_rng.random() < 0.1:  # 10% chance to look for powerups
             closest_powerup = None
             closest_powerup_dist = float('inf')
 
             for powerup in powerups:
-                px = powerup['x'] - ai_ball['x']
-                py = powerup['y'] - ai_ball['y']
+                px = powerup['x'] - ai_ball.x
+                py = powerup['y'] - ai_ball.y
                 powerup_dist = math.sqrt(px * px + py * py)
 
                 if powerup_dist < closest_powerup_dist:
@@ -1773,20 +3711,20 @@ def move_ai_ball_coop(ai_ball, player_ball, current_time):
 
             if closest_powerup and closest_powerup_dist < 200:  # Only go for nearby powerups
                 # Go for powerup
-                if closest_powerup['x'] > ai_ball['x']:
+                if closest_powerup['x'] > ai_ball.x:
                     move_x += BALL_SPEED * AI_SPEED * speed_mult
-                if closest_powerup['x'] < ai_ball['x']:
+                if closest_powerup['x'] < ai_ball.x:
                     move_x -= BALL_SPEED * AI_SPEED * speed_mult
-                if closest_powerup['y'] > ai_ball['y']:
+                if closest_powerup['y'] > ai_ball.y:
                     move_y += BALL_SPEED * AI_SPEED * speed_mult
-                if closest_powerup['y'] < ai_ball['y']:
+                if closest_powerup['y'] < ai_ball.y:
                     move_y -= BALL_SPEED * AI_SPEED * speed_mult
             else:
                 # Chase player directly with some prediction
-                predicted_x = player_ball['x'] + player_ball['vx'] * 5
-                predicted_y = player_ball['y'] + player_ball['vy'] * 5
-                dx_pred = predicted_x - ai_ball['x']
-                dy_pred = predicted_y - ai_ball['y']
+                predicted_x = player_ball.x + player_ball.vx * 5
+                predicted_y = player_ball.y + player_ball.vy * 5
+                dx_pred = predicted_x - ai_ball.x
+                dy_pred = predicted_y - ai_ball.y
 
                 if dx_pred > 0:
                     move_x += BALL_SPEED * AI_SPEED * speed_mult
@@ -1798,10 +3736,10 @@ def move_ai_ball_coop(ai_ball, player_ball, current_time):
                     move_y -= BALL_SPEED * AI_SPEED * speed_mult
         else:
             # Chase player directly with some prediction
-            predicted_x = player_ball['x'] + player_ball['vx'] * 5
-            predicted_y = player_ball['y'] + player_ball['vy'] * 5
-            dx_pred = predicted_x - ai_ball['x']
-            dy_pred = predicted_y - ai_ball['y']
+            predicted_x = player_ball.x + player_ball.vx * 5
+            predicted_y = player_ball.y + player_ball.vy * 5
+            dx_pred = predicted_x - ai_ball.x
+            dy_pred = predicted_y - ai_ball.y
 
             if dx_pred > 0:
                 move_x += BALL_SPEED * AI_SPEED * speed_mult
@@ -1813,46 +3751,204 @@ def move_ai_ball_coop(ai_ball, player_ball, current_time):
                 move_y -= BALL_SPEED * AI_SPEED * speed_mult
 
     # Apply movement
-    ai_ball['vx'] += move_x * AI_ACCELERATION * speed_mult
-    ai_ball['vy'] += move_y * AI_ACCELERATION * speed_mult
+    ai_ball.vx += move_x * AI_ACCELERATION * speed_mult
+    ai_ball.vy += move_y * AI_ACCELERATION * speed_mult
 
 
 def apply_physics(ball):
-    old_x, old_y = ball['x'], ball['y']
-
-    if ball.get('frozen', False):
-        ball['vx'] *= FRICTION * 0.95
-        ball['vy'] *= FRICTION * 0.95
+    if ball.frozen:
+        ball.vx *= FRICTION * 0.95
+        ball.vy *= FRICTION * 0.95
     else:
-        ball['vx'] *= FRICTION
-        ball['vy'] *= FRICTION
+        ball.vx *= FRICTION
+        ball.vy *= FRICTION
+
+    ball.x += ball.vx
+    ball.y += ball.vy
 
-    ball['x'] += ball['vx']
-    ball['y'] += ball['vy']
+    extend_tron_trail(ball)
 
+
+def extend_tron_trail(ball):
+    """Stretch a tron ball's trail to its current position"""
     # Update tron trail if active
-    if ball['powerup'] == 'tron':
+    if ball.powerup == 'tron':
         # Get last trail segment
-        if ball['tron_trail']:
-            last_segment = ball['tron_trail'][-1]
+        if ball.tron_trail:
+            last_segment = ball.tron_trail[-1]
             # Update end point of last segment
-            last_segment['end'] = (ball['x'], ball['y'])
+            last_segment['end'] = (ball.x, ball.y)
 
             # If we've moved far enough, start a new segment
-            dx = ball['x'] - last_segment['start'][0]
-            dy = ball['y'] - last_segment['start'][1]
+            dx = ball.x - last_segment['start'][0]
+            dy = ball.y - last_segment['start'][1]
             if math.sqrt(dx * dx + dy * dy) > 20:  # Minimum segment length
-                ball['tron_trail'].append({
-                    'start': (ball['x'], ball['y']),
-                    'end': (ball['x'], ball['y']),
+                ball.tron_trail.append({
+                    'start': (ball.x, ball.y),
+                    'end': (ball.x, ball.y),
                     # Use the brightest color of the ball
-                    'color': ball['colors'][2]
+                    'color': ball.colors[2]
                 })
+                # The previous segment is finished; add it to the grid
+                tron_trail_index(ball)
+
+
+def tron_trail_index(ball):
+    """Return the index of a ball's finished tron segments.
+
+    Segments are bucketed into every TRON_CELL_SIZE cell their bounding
+    box touches once the trail has moved on past them, so only newly
+    finished segments are added on each call. The last segment is still
+    being stretched and stays out of the grid. A new trail list (powerup
+    picked up again, round reset) starts a new index.
+
+    With NumPy each segment is also copied into a contiguous array of
+    (x1, y1, x2, y2) rows for segment_hit, with a spare row kept for the
+    last segment.
+    """
+    trail = ball.tron_trail
+    index = ball.tron_index
+    if index is None or index['trail'] is not trail:
+        index = {'trail': trail, 'count': 0, 'cells': {}}
+        if np is not None:
+            index['segments'] = np.empty((16, 4))
+        ball.tron_index = index
+
+    cells = index['cells']
+    while index['count'] < len(trail) - 1:
+        (x1, y1), (x2, y2) = (trail[index['count']]['start'],
+                              trail[index['count']]['end'])
+        for cell_x in range(int(min(x1, x2) // TRON_CELL_SIZE),
+                            int(max(x1, x2) // TRON_CELL_SIZE) + 1):
+            for cell_y in range(int(min(y1, y2) // TRON_CELL_SIZE),
+                                int(max(y1, y2) // TRON_CELL_SIZE) + 1):
+                cells.setdefault((cell_x, cell_y), []).append(index['count'])
+
+        if np is not None:
+            if index['count'] + 1 >= len(index['segments']):
+                grown = np.empty((len(index['segments']) * 2, 4))
+                grown[:index['count']] = index['segments'][:index['count']]
+                index['segments'] = grown
+            index['segments'][index['count']] = (x1, y1, x2, y2)
+        index['count'] += 1
+    return index
+
+
+def nearby_tron_segments(trail_ball, ball):
+    """Return the indices of trail_ball's tron segments near ball, in order"""
+    trail = trail_ball.tron_trail
+    cells = tron_trail_index(trail_ball)['cells']
+    x, y, radius = ball.x, ball.y, ball.radius
+
+    found = set()
+    for cell_x in range(int((x - radius) // TRON_CELL_SIZE),
+                        int((x + radius) // TRON_CELL_SIZE) + 1):
+        for cell_y in range(int((y - radius) // TRON_CELL_SIZE),
+                            int((y + radius) // TRON_CELL_SIZE) + 1):
+            found.update(cells.get((cell_x, cell_y), ()))
+
+    # The segment still being stretched is always tested
+    return sorted(found) + [len(trail) - 1]
+
+
+def segment_hit(segments, x, y, radius):
+    """Find the segment nearest to a ball among rows of (x1, y1, x2, y2).
+
+    Projections, clamping and distances for every row are computed in one
+    NumPy pass. Returns the unit normal pointing from the nearest segment
+    to the ball centre if it lies within radius, otherwise None.
+    Zero-length segments and segments through the ball centre are ignored,
+    as in nearest_segment_hit().
+    """
+    x1, y1, x2, y2 = segments.T
+    line_x = x2 - x1
+    line_y = y2 - y1
+    length_squared = line_x * line_x + line_y * line_y
+
+    # Project the ball centre onto each line and clamp to the segment
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = ((x - x1) * line_x + (y - y1) * line_y) / length_squared
+    t = np.clip(t, 0.0, 1.0)
+    dx = x - (x1 + t * line_x)
+    dy = y - (y1 + t * line_y)
+    distance_squared = dx * dx + dy * dy
+    distance_squared = np.where(
+        (length_squared > 0) & (distance_squared > 0), distance_squared,
+        np.inf)
+
+    nearest = int(np.argmin(distance_squared))
+    distance = math.sqrt(distance_squared[nearest])
+    if not distance < radius:
+        return None
+    return (float(dx[nearest]) / distance, float(dy[nearest]) / distance)
+
+
+def tron_trail_hit(trail_ball, ball):
+    """Return the bounce normal from the nearest tron segment ball touches"""
+    trail = trail_ball.tron_trail
+    index = tron_trail_index(trail_ball)
+    candidates = nearby_tron_segments(trail_ball, ball)
+
+    if np is not None and len(candidates) >= TRON_KERNEL_MIN_SEGMENTS:
+        (x1, y1), (x2, y2) = trail[-1]['start'], trail[-1]['end']
+        index['segments'][index['count']] = (x1, y1, x2, y2)
+        return segment_hit(index['segments'][candidates],
+                           ball.x, ball.y, ball.radius)
+    return nearest_segment_hit([trail[i] for i in candidates],
+                               ball.x, ball.y, ball.radius)
+
+
+def nearest_segment_hit(segments, x, y, radius):
+    """Scalar segment_hit() over tron trail segments, one at a time.
+
+    Segments of zero length, or passing through the ball centre (which
+    give no direction to bounce in), are skipped.
+    """
+    nearest = None
+    for segment in segments:
+        # Calculate distance from point (ball center) to line segment
+        x1, y1 = segment['start']
+        x2, y2 = segment['end']
+
+        # Vector from line start to end
+        line_vec = (x2 - x1, y2 - y1)
+        # Vector from line start to ball
+        ball_vec = (x - x1, y - y1)
+        line_length = math.sqrt(line_vec[0]**2 + line_vec[1]**2)
+
+        if line_length == 0:
+            continue
+
+        # Normalize line vector
+        unit_line = (line_vec[0] / line_length, line_vec[1] / line_length)
+
+        # Project ball vector onto line vector
+        proj_length = ball_vec[0] * unit_line[0] + \
+            ball_vec[1] * unit_line[1]
+
+        # Get closest point on line segment
+        if proj_length < 0:
+            closest = (x1, y1)
+        elif proj_length > line_length:
+            closest = (x2, y2)
+        else:
+            closest = (x1 + unit_line[0] * proj_length,
+                       y1 + unit_line[1] * proj_length)
+
+        # Check distance from ball to closest point
+        dx = x - closest[0]
+        dy = y - closest[1]
+        distance = math.sqrt(dx**2 + dy**2)
+
+        if 0 < distance < radius and (
+                nearest is None or distance < nearest[0]):
+            nearest = (distance, (dx / distance, dy / distance))
+
+    return nearest[1] if nearest else None
 
 
 def spawn_powerup():
     """Spawn a random powerup on the platform"""
-    powerup_types = ['grow', 'shrink', 'shield', 'freeze', 'heavy', 'tron']
     powerup_colors = {
         'grow': [DARKER_YELLOW, YELLOW, LIGHT_YELLOW],
         'shrink': [DARKER_GREEN, GREEN, LIGHT_GREEN],
@@ -1862,14 +3958,14 @@ def spawn_powerup():
         'tron': [DARKER_TEAL, DARK_TEAL, TEAL]
     }
 
-    type = random.choice(powerup_types)
-    x = random.randint(
+    type = match_rng.choice(POWERUP_TYPES)
+    x = match_rng.randint(
         PLATFORM_X +
         POWERUP_SIZE,
         PLATFORM_X +
         PLATFORM_SIZE -
         POWERUP_SIZE)
-    y = random.randint(
+    y = match_rng.randint(
         PLATFORM_Y +
         POWERUP_SIZE,
         PLATFORM_Y +
@@ -1886,7 +3982,7 @@ def spawn_powerup():
 
 def draw_powerups():
     """Draw all active powerups with a glossy effect"""
-    current_time = pygame.time.get_ticks()
+    current_time = get_ticks()
 
     for powerup in powerups:
         x, y = powerup['x'], powerup['y']
@@ -1902,7 +3998,7 @@ def draw_powerups():
             colors = powerup['colors']
 
         # Draw shadow
-        pygame.draw.circle(screen, BLACK, (x, y), POWERUP_SIZE + 2)
+        mark_dirty(pygame.draw.circle(screen, BLACK, (x, y), POWERUP_SIZE + 2))
 
         # Draw main circles with gradient effect
         for i, color in enumerate(colors):
@@ -1922,11 +4018,11 @@ def check_powerup_collision(ball):
     """Check if ball collides with any powerup"""
     global powerups
     for powerup in powerups[:]:
-        dx = ball['x'] - powerup['x']
-        dy = ball['y'] - powerup['y']
+        dx = ball.x - powerup['x']
+        dy = ball.y - powerup['y']
         dist = (dx**2 + dy**2)**0.5
 
-        if dist < ball['radius'] + POWERUP_SIZE:
+        if dist < ball.radius + POWERUP_SIZE:
             apply_powerup(ball, powerup['type'])
             powerups.remove(powerup)
 
@@ -1935,140 +4031,106 @@ def apply_powerup(ball, powerup_type):
     """Apply powerup effect to ball with time limit"""
     global coop_ai_balls # Move global declaration to the beginning   
 
-    current_time = pygame.time.get_ticks()
-    ball['powerup'] = powerup_type
-    ball['powerup_end'] = current_time + POWERUP_DURATIONS[powerup_type]
+    current_time = get_ticks()
+    ball.powerup = powerup_type
+    ball.powerup_end = current_time + POWERUP_DURATIONS[powerup_type]
 
     if powerup_type == 'tron':
-        ball['tron_trail'] = []  # Initialize empty trail
+        ball.tron_trail = []  # Initialize empty trail
         # Add first trail point with ball's color
-        ball['tron_trail'].append({
-            'start': (ball['x'], ball['y']),
-            'end': (ball['x'], ball['y']),
-            'color': ball['colors'][2]  # Use the brightest color of the ball
+        ball.tron_trail.append({
+            'start': (ball.x, ball.y),
+            'end': (ball.x, ball.y),
+            'color': ball.colors[2]  # Use the brightest color of the ball
         })
     elif powerup_type == 'heavy':
-        ball['heavy_hit'] = True
+        ball.heavy_hit = True
     elif powerup_type == 'grow':
-        ball['radius'] = BALL_RADIUS * GROW_MULTIPLIER
+        ball.radius = ball.base_radius * GROW_MULTIPLIER
     elif powerup_type == 'shrink':
         # Shrink all other active balls
-        active_balls = get_active_balls()
-        for other_ball in active_balls.values():
+        for other_ball in get_active_ball_list():
             if other_ball != ball:
-                other_ball['radius'] = BALL_RADIUS * SHRINK_MULTIPLIER
+                other_ball.radius = (
+                    other_ball.base_radius * SHRINK_MULTIPLIER)
 
         # Also shrink AI balls in Co-op mode
-        if selected_game_mode == "Co-op":
+        if selected_game_mode in COOP_MODES:
             for ai_ball in coop_ai_balls:
-                ai_ball['radius'] = BALL_RADIUS * SHRINK_MULTIPLIER
+                ai_ball.radius = ai_ball.base_radius * SHRINK_MULTIPLIER
     elif powerup_type == 'freeze':
         # Freeze all other active balls
-        active_balls = get_active_balls()
-        for other_ball in active_balls.values():
+        for other_ball in get_active_ball_list():
             if other_ball != ball:
-                other_ball['frozen'] = True
-                other_ball['frozen_end'] = current_time + \
+                other_ball.frozen = True
+                other_ball.frozen_end = current_time + \
                     POWERUP_DURATIONS['freeze']
 
         # Also freeze AI balls in Co-op mode
-        if selected_game_mode == "Co-op":
+        if selected_game_mode in COOP_MODES:
             for ai_ball in coop_ai_balls:
-                ai_ball['frozen'] = True
-                ai_ball['frozen_end'] = current_time + \
+                ai_ball.frozen = True
+                ai_ball.frozen_end = current_time + \
                     POWERUP_DURATIONS['freeze']
 
 
 def check_powerup_expiry(ball):
     """Check if ball's powerup has expired"""
-    current_time = pygame.time.get_ticks()
-    if ball['powerup'] and current_time >= ball['powerup_end']:
-        if ball['powerup'] == 'tron':
-            ball['tron_trail'] = []  # Clear trail
-        if ball['powerup'] == 'heavy':
-            ball['heavy_hit'] = False
-        if ball['powerup'] == 'shrink':
+    current_time = get_ticks()
+    if ball.powerup and current_time >= ball.powerup_end:
+        if ball.powerup == 'tron':
+            ball.tron_trail = []  # Clear trail
+        if ball.powerup == 'heavy':
+            ball.heavy_hit = False
+        if ball.powerup == 'shrink':
             # Restore other balls to normal size
-            active_balls = get_active_balls()
-            for other_ball in active_balls.values():
+            for other_ball in get_active_ball_list():
                 if other_ball != ball:
-                    other_ball['radius'] = BALL_RADIUS
-        elif ball['powerup'] == 'freeze':
+                    other_ball.radius = other_ball.base_radius
+        elif ball.powerup == 'freeze':
             # Restore other balls from frozen state
-            active_balls = get_active_balls()
-            for other_ball in active_balls.values():
+            for other_ball in get_active_ball_list():
                 if other_ball != ball:
-                    other_ball['frozen'] = False
-                    other_ball['frozen_end'] = 0
+                    other_ball.frozen = False
+                    other_ball.frozen_end = 0
         # Reset ball's powerup
-        ball['powerup'] = None
-        ball['radius'] = BALL_RADIUS
+        ball.powerup = None
+        ball.radius = ball.base_radius
 
 
 def check_tron_trail_collision(ball):
     """Check if ball has hit any tron trails"""
-    active_balls = get_active_balls()
-    for other_ball in active_balls.values():
+    for other_ball in get_active_ball_list():
         # Skip if it's the same ball or if the other ball has no trail
         # Also skip if this ball is the one with the tron powerup
-        if (other_ball == ball or not other_ball.get('tron_trail')
-                or ball['powerup'] == 'tron'):  # Changed this line to check if the checking ball has tron
+        if (other_ball == ball or not other_ball.tron_trail
+                or ball.powerup == 'tron'):  # Changed this line to check if the checking ball has tron
             continue
 
-        # Check collision with each trail segment
-        for segment in other_ball['tron_trail']:
-            # Calculate distance from point (ball center) to line segment
-            x1, y1 = segment['start']
-            x2, y2 = segment['end']
-
-            # Vector from line start to end
-            line_vec = (x2 - x1, y2 - y1)
-            # Vector from line start to ball
-            ball_vec = (ball['x'] - x1, ball['y'] - y1)
-            line_length = math.sqrt(line_vec[0]**2 + line_vec[1]**2)
-
-            if line_length == 0:
-                continue
-
-            # Normalize line vector
-            unit_line = (line_vec[0] / line_length, line_vec[1] / line_length)
-
-            # Project ball vector onto line vector
-            proj_length = ball_vec[0] * unit_line[0] + \
-                ball_vec[1] * unit_line[1]
-
-            # Get closest point on line segment
-            if proj_length < 0:
-                closest = (x1, y1)
-            elif proj_length > line_length:
-                closest = (x2, y2)
-            else:
-                closest = (x1 + unit_line[0] * proj_length,
-                           y1 + unit_line[1] * proj_length)
-
-            # Check distance from ball to closest point
-            dx = ball['x'] - closest[0]
-            dy = ball['y'] - closest[1]
-            distance = math.sqrt(dx**2 + dy**2)
-
-            if distance < ball['radius']:
-                # Collision detected - bounce the ball
-                normal = (dx / distance, dy / distance)
-                ball['vx'] = normal[0] * abs(ball['vx'] + ball['vy'])
-                ball['vy'] = normal[1] * abs(ball['vx'] + ball['vy'])
-                collision_sound.play()
-                return
+        normal = tron_trail_hit(other_ball, ball)
+        if normal is not None:
+            # Collision detected - bounce the ball
+            impact = -(ball.vx * normal[0] + ball.vy * normal[1])
+            ball.vx = normal[0] * abs(ball.vx + ball.vy)
+            ball.vy = normal[1] * abs(ball.vx + ball.vy)
+            collision_sounds.play(('tron', id(other_ball), id(ball)),
+                                  impact, get_ticks())
+            return
 
 
-def init_coop_mode():
+def init_coop_mode(level=1):
     """Initialize Co-op mode for a new game"""
     global coop_level, coop_ai_balls, eliminated_players
-    coop_level = 1
+    coop_level = level
     eliminated_players = set()
+    active_roster.invalidate()
 
     # Clear and create initial AI ball(s)
     coop_ai_balls = []
-    spawn_coop_ai_balls()
+    if selected_game_mode == "Arena":
+        spawn_arena_ai_balls()
+    else:
+        spawn_coop_ai_balls()
 
     # Reset all player balls
     reset_balls()
@@ -2098,36 +4160,75 @@ def spawn_coop_ai_balls():
 
         # Create an AI ball with color based on level
         color_index = min(i, len(AI_COLORS) - 1)  # Prevent index out of range
-        ai_ball = {
-            'x': x,
-            'y': y,
-            'vx': 0,
-            'vy': 0,
-            'colors': AI_COLORS[color_index],
-            'radius': BALL_RADIUS,
-            'powerup': None,
-            'powerup_end': 0,
-            'last_hit_by': None,
-            'trail': [],
-            'frozen': False,
-            'frozen_end': 0,
-            'heavy_hit': False,
-            'hit_flash_start': 0,
-            'tron_trail': [],
-            'is_ai': True,
+        ai_ball = create_ball(
+            x, y, AI_COLORS[color_index],
+            is_ai=True,
             # Speed increases with level, caps at +50%
-            'speed_multiplier': 1.0 + (0.1 * min(coop_level - 1, 5))
-        }
+            speed_multiplier=1.0 + (0.1 * min(coop_level - 1, 5)))
 
         coop_ai_balls.append(ai_ball)
 
 
+def arena_spawn_points(spacing):
+    """Spots spacing apart on rings around the centre, outermost first.
+
+    As in spawn_coop_ai_balls() the rings circle the platform centre;
+    each holds as many spots as fit around it. Spots too close to a
+    player's spawn point are left out.
+    """
+    platform_center_x = PLATFORM_X + PLATFORM_SIZE / 2
+    platform_center_y = PLATFORM_Y + PLATFORM_SIZE / 2
+    player_spawns = [get_spawn_positions()[color]
+                     for color in get_active_balls()]
+
+    points = []
+    radius = PLATFORM_SIZE / 2 - AI_PLATFORM_MARGIN
+    while radius > 0:
+        places = max(1, int(2 * math.pi * radius / spacing))
+        for i in range(places):
+            angle = 2 * math.pi * i / places
+            x = platform_center_x + radius * math.cos(angle)
+            y = platform_center_y + radius * math.sin(angle)
+            if all(math.hypot(x - spawn_x, y - spawn_y) >= ARENA_RING_SPACING
+                   for spawn_x, spawn_y in player_spawns):
+                points.append((x, y))
+        radius -= spacing
+    return points
+
+
+def spawn_arena_ai_balls():
+    """Spawn selected_arena_balls AI balls spread over arena_spawn_points().
+
+    Full-size balls fit about a hundred on a medium platform; for more
+    the rings close up and the balls shrink with them until every ball
+    has a spot, so a crowded arena starts without overlaps.
+    """
+    global coop_ai_balls
+    spacing = ARENA_RING_SPACING
+    points = arena_spawn_points(spacing)
+    while len(points) < selected_arena_balls:
+        spacing *= 0.95
+        points = arena_spawn_points(spacing)
+    radius = min(BALL_RADIUS, BALL_RADIUS * spacing / ARENA_RING_SPACING)
+
+    # Every ring gets its share rather than the outer rings filling first
+    coop_ai_balls = []
+    for i in range(selected_arena_balls):
+        x, y = points[i * len(points) // selected_arena_balls]
+        coop_ai_balls.append(create_ball(
+            x, y, AI_COLORS[i % len(AI_COLORS)], is_ai=True, radius=radius))
+
+
 def show_level_message():
-    """Show level transition message"""
-    global coop_level
+    """Queue the level transition message"""
+    schedule_transition(draw_level_message, 2000)  # 2 seconds
+
+
+def draw_level_message():
+    """Draw level transition message"""
     screen.fill(BACKGROUND_COLOR)
     draw_text_with_outline(
-        f"Level {coop_level}",
+        "Arena" if selected_game_mode == "Arena" else f"Level {coop_level}",
         title_font,
         WIDTH // 2,
         HEIGHT // 3,
@@ -2176,9 +4277,10 @@ def show_level_message():
             y_pos += 30
 
     # Show enemy count
+    ai_count = len(coop_ai_balls)
     draw_text_with_outline(
-        f"{coop_level} AI Opponent{
-            '' if coop_level == 1 else 's'}",
+        f"{ai_count} AI Opponent{
+            '' if ai_count == 1 else 's'}",
         subtitle_font,
         WIDTH // 2,
         HEIGHT * 3 // 4 - 30,
@@ -2196,10 +4298,8 @@ def show_level_message():
         BLACK,
         center=True)
 
-    pygame.display.flip()
-    time.sleep(2)  # Show message for 2 seconds
-
 
+@trace_screen
 def show_game_over_screen():
     """Show game over screen for Co-op mode"""
     global coop_level
@@ -2262,6 +4362,7 @@ def show_game_over_screen():
         last_time = current_time
 
         for event in pygame.event.get():
+            handle_controller_event(event)
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
@@ -2271,11 +4372,9 @@ def show_game_over_screen():
 
         # Also allow controller buttons to skip
         if current_time - start_time > 1000:
-            for i in range(len(controllers)):
-                if controllers[i].get_button(
-                        0) or controllers[i].get_button(7):
-                    waiting = False
-                    break
+            input_sampler.sample_controllers()
+            if input_sampler.confirm_pressed():
+                waiting = False
 
         screen.fill(BACKGROUND_COLOR)
 
@@ -2303,13 +4402,8 @@ def show_game_over_screen():
                 ball['vel']['y'] = -abs(ball['vel']['y'])
 
             # Draw ball
-            draw_ball({
-                'x': ball['pos']['x'],
-                'y': ball['pos']['y'],
-                'radius': BALL_RADIUS,
-                'colors': ball['colors'],
-                'powerup': None
-            })
+            draw_ball(create_ball(
+                ball['pos']['x'], ball['pos']['y'], ball['colors']))
 
         # Draw game over text
         draw_text_with_outline(
@@ -2323,6 +4417,8 @@ def show_game_over_screen():
 
         # Draw level reached
         level_text = f"Your team reached Level {coop_level}"
+        if selected_game_mode == "Arena":
+            level_text = f"{len(coop_ai_balls)} AI Balls Left"
         draw_text_with_outline(
             level_text,
             subtitle_font,
@@ -2334,6 +4430,8 @@ def show_game_over_screen():
 
         # Draw AI defeated count
         ai_count = coop_level - 1  # Players defeated all AI in previous levels
+        if selected_game_mode == "Arena":
+            ai_count = selected_arena_balls - len(coop_ai_balls)
         ai_text = f"AI Defeated: {ai_count}"
         draw_text_with_outline(
             ai_text,
@@ -2359,6 +4457,7 @@ def show_game_over_screen():
         clock.tick(FPS)
 
 
+@trace_screen
 def show_victory_screen():
     """Show victory screen when players beat all levels in Co-op mode"""
     global coop_level, MAX_AI_BALLS
@@ -2412,6 +4511,7 @@ def show_victory_screen():
         last_time = current_time
 
         for event in pygame.event.get():
+            handle_controller_event(event)
             if event.type == QUIT:
                 pygame.quit()
                 sys.exit()
@@ -2421,11 +4521,9 @@ def show_victory_screen():
 
         # Also allow controller buttons to skip
         if current_time - start_time > 1000:
-            for i in range(len(controllers)):
-                if controllers[i].get_button(
-                        0) or controllers[i].get_button(7):
-                    waiting = False
-                    break
+            input_sampler.sample_controllers()
+            if input_sampler.confirm_pressed():
+                waiting = False
 
         screen.fill(BACKGROUND_COLOR)
 
@@ -2453,13 +4551,8 @@ def show_victory_screen():
                 ball['vel']['y'] = -abs(ball['vel']['y'])
 
             # Draw ball
-            draw_ball({
-                'x': ball['pos']['x'],
-                'y': ball['pos']['y'],
-                'radius': BALL_RADIUS,
-                'colors': ball['colors'],
-                'powerup': None
-            })
+            draw_ball(create_ball(
+                ball['pos']['x'], ball['pos']['y'], ball['colors']))
 
         # Draw victory text
         draw_text_with_outline(
@@ -2473,6 +4566,8 @@ def show_victory_screen():
 
         # Draw congratulatory text
         victory_text = f"You beat all {MAX_AI_BALLS} levels!"
+        if selected_game_mode == "Arena":
+            victory_text = f"You cleared all {selected_arena_balls} AI balls!"
         draw_text_with_outline(
             victory_text,
             subtitle_font,
@@ -2497,273 +4592,71 @@ def show_victory_screen():
         clock.tick(FPS)
 
 
+@trace_screen
 def coop_game():
     """Main game loop for Co-op mode"""
-    global powerups, last_powerup_spawn, eliminated_players, coop_level
-
     # Initialize Co-op mode
-    init_coop_mode()
+    sim = Simulation(seed=args.seed)
+    input_log = InputLog.for_simulation(sim) if args.record else None
+    input_sampler.reset_latency()
+    show_ready_message()
     show_level_message()
-
-    # Reset game state
-    powerups = []
-    last_powerup_spawn = pygame.time.get_ticks()
-    active_players = get_active_balls()  # Only human players
-
-    # Check for controllers periodically
-    controller_check_time = pygame.time.get_ticks()
+    timestep = FixedTimestep()
+    full_redraw = True
 
     while True:
-        current_time = pygame.time.get_ticks()
-        keys = pygame.key.get_pressed()
-
-        # Check for controller changes every few seconds
-        if current_time - controller_check_time > 3000:
-            check_for_new_controllers()
-            controller_check_time = current_time
-
-        # Handle player movements
-        if 'red' in active_players:
-            move_ball(
-                red_ball,
-                keys,
-                pygame.K_w,
-                pygame.K_s,
-                pygame.K_a,
-                pygame.K_d,
-                0)
-
-        if 'blue' in active_players:
-            move_ball(
-                blue_ball,
-                keys,
-                pygame.K_UP,
-                pygame.K_DOWN,
-                pygame.K_LEFT,
-                pygame.K_RIGHT,
-                1 if len(controllers) > 1 else -1)
-
-        if 'orange' in active_players:
-            move_ball(
-                orange_ball,
-                keys,
-                pygame.K_i,
-                pygame.K_k,
-                pygame.K_j,
-                pygame.K_l,
-                2 if len(controllers) > 2 else -1)
-
-        if 'purple' in active_players:
-            move_ball(
-                purple_ball,
-                keys,
-                pygame.K_KP8,
-                pygame.K_KP5,
-                pygame.K_KP4,
-                pygame.K_KP6,
-                3 if len(controllers) > 3 else -1)
-
-        # Handle AI movements
-        for ai_ball in coop_ai_balls:
-            # Find closest human player to target
-            closest_player = None
-            closest_dist = float('inf')
-
-            for player_ball in active_players.values():
-                dx = player_ball['x'] - ai_ball['x']
-                dy = player_ball['y'] - ai_ball['y']
-                dist = math.sqrt(dx * dx + dy * dy)
-
-                if dist < closest_dist:
-                    closest_dist = dist
-                    closest_player = player_ball
-
-            if closest_player:
-                # Use the existing AI movement code with the closest player
-                move_ai_ball_coop(ai_ball, closest_player, current_time)
-
-        # Spawn powerups
-        if current_time - last_powerup_spawn > selected_powerup_interval:
-            if len(powerups) < 3:
-                powerups.append(spawn_powerup())
-                last_powerup_spawn = current_time
-
+        perf_overlay.start_frame()
         for event in pygame.event.get():
+            handle_controller_event(event)
             if event.type == QUIT:
+                end_match(input_log)
                 pygame.quit()
                 sys.exit()
+            if event.type == KEYDOWN and event.key == pygame.K_F3:
+                perf_overlay.toggle()
+            if event.type == KEYDOWN and event.key == pygame.K_F4:
+                tracer.flush()
+
+        # Hold the match while a message is up
+        if update_transitions():
+            draw_transition()
+            timestep.reset()
+            full_redraw = True
+            clock.tick(FPS)
+            continue
 
-        # Apply physics to all balls and check powerup collisions
-        for ball in active_players.values():
-            apply_physics(ball)
-            check_powerup_collision(ball)
-
-        for ai_ball in coop_ai_balls:
-            apply_physics(ai_ball)
-            check_powerup_collision(ai_ball)
-
-        # Handle collisions between players
-        ball_list = list(active_players.values())
-        for i in range(len(ball_list)):
-            for j in range(i + 1, len(ball_list)):
-                handle_collision(ball_list[i], ball_list[j])
-
-        # Handle collisions between players and AI
-        for player_ball in active_players.values():
-            for ai_ball in coop_ai_balls:
-                handle_collision(player_ball, ai_ball)
-
-        # Handle collisions between AI balls
-        for i in range(len(coop_ai_balls)):
-            for j in range(i + 1, len(coop_ai_balls)):
-                handle_collision(coop_ai_balls[i], coop_ai_balls[j])
-
-        # Check for fallen players
-        fallen_players = []
-        for color, player_ball in active_players.items():
-            if is_off_platform(player_ball):
-                fallen_players.append((color, player_ball))
-
-        # Handle fallen players in Co-op mode
-        for color, player_ball in fallen_players:
-            # Mark player as eliminated
-            eliminated_players.add(color)
-            # Remove from active players
-            del active_players[color]
-
-        # Check for fallen AI balls
-        fallen_ai = []
-        for i, ai_ball in enumerate(coop_ai_balls):
-            if is_off_platform(ai_ball):
-                fallen_ai.append(i)
-
-        # Remove fallen AI (in reverse order to avoid index issues)
-        for i in sorted(fallen_ai, reverse=True):
-            coop_ai_balls.pop(i)
-
-        # Check end conditions
-        if not active_players:
-            # All players eliminated - game over
-            show_game_over_screen()
-            return
+        input_sampler.sample(pygame.key.get_pressed())
+        perf_overlay.lap('input')
+        for _ in range(timestep.advance()):
+            input_sampler.consume()
+            if input_log is not None:
+                input_log.record(input_sampler.state)
+            events = sim.step(input_sampler.movement)
+
+            if 'game_over' in events:
+                # All players eliminated
+                end_match(input_log)
+                show_game_over_screen()
+                return
 
-        if not coop_ai_balls:
-            # All AI eliminated - advance to next level
-            coop_level += 1
-            if coop_level > MAX_AI_BALLS:
-                # Player beat the maximum level - victory!
+            if 'victory' in events:
+                # Player beat the maximum level
+                end_match(input_log)
                 show_victory_screen()
                 return
 
-            # Reset eliminated players for next level - everyone comes back
-            eliminated_players = set()
-
-            # Reset all ball positions to proper spawn positions
-            spawn_pos = get_spawn_positions()
-            red_ball['x'], red_ball['y'] = spawn_pos['red']
-            red_ball['vx'], red_ball['vy'] = 0, 0
-            if selected_player_count >= 2:
-                blue_ball['x'], blue_ball['y'] = spawn_pos['blue']
-                blue_ball['vx'], blue_ball['vy'] = 0, 0
-            if selected_player_count >= 3:
-                orange_ball['x'], orange_ball['y'] = spawn_pos['orange']
-                orange_ball['vx'], orange_ball['vy'] = 0, 0
-            if selected_player_count >= 4:
-                purple_ball['x'], purple_ball['y'] = spawn_pos['purple']
-                purple_ball['vx'], purple_ball['vy'] = 0, 0
-
-            # Clear powerups for all players
-            red_ball['powerup'] = None
-            red_ball['radius'] = BALL_RADIUS
-            if selected_player_count >= 2:
-                blue_ball['powerup'] = None
-                blue_ball['radius'] = BALL_RADIUS
-            if selected_player_count >= 3:
-                orange_ball['powerup'] = None
-                orange_ball['radius'] = BALL_RADIUS
-            if selected_player_count >= 4:
-                purple_ball['powerup'] = None
-                purple_ball['radius'] = BALL_RADIUS
-
-            # Clear all powerups on the field
-            powerups = []
-
-            # Update active players
-            active_players = get_active_balls()
-
-            # Spawn new AI balls for next level
-            spawn_coop_ai_balls()
-
-            # Show level message
-            show_level_message()
-
-            # Start next level
-            eliminated_players = set()  # Respawn all players
-            active_players = get_active_balls()
-            spawn_coop_ai_balls()
-            show_level_message()
-
-        # Apply physics effects after collisions
-        for ball in active_players.values():
-            # Check powerup expiry
-            check_powerup_expiry(ball)
-            # Check frozen state
-            if ball.get(
-                    'frozen',
-                    False) and current_time >= ball.get(
-                    'frozen_end',
-                    0):
-                ball['frozen'] = False
-                ball['frozen_end'] = 0
-            # Check tron trail collisions
-            check_tron_trail_collision(ball)
-
-        for ai_ball in coop_ai_balls:
-            # Check powerup expiry
-            check_powerup_expiry(ai_ball)
-            # Check frozen state
-            if ai_ball.get(
-                    'frozen',
-                    False) and current_time >= ai_ball.get(
-                    'frozen_end',
-                    0):
-                ai_ball['frozen'] = False
-                ai_ball['frozen_end'] = 0
-            # Check tron trail collisions
-            check_tron_trail_collision(ai_ball)
+            if 'level_up' in events:
+                show_level_message()
+                break
 
         # Render everything
-        screen.fill(BACKGROUND_COLOR)
-        draw_platform()
-        draw_powerups()
-
-        # Draw level indicator for Co-op mode
-        draw_text_with_outline(
-            f"Level {coop_level}",
-            subtitle_font,
-            WIDTH // 2,
-            20,
-            WHITE,
-            BLACK,
-            center=True)
-
-        # Draw all active players
-        for ball in active_players.values():
-            draw_ball(ball)
-
-        # Draw all AI balls
-        for ai_ball in coop_ai_balls:
-            draw_ball(ai_ball)
-
-        # Draw scores (for Co-op, just show active/dead status)
-        draw_coop_status()
-
-        # Draw controller indicators
-        if len(controllers) > 0:
-            draw_controller_indicators()
-
-        pygame.display.flip()
-        clock.tick(FPS)
+        begin_frame(full_redraw)
+        full_redraw = False
+        draw_game_frame(sim, timestep.alpha)
+        perf_overlay.draw()
+        end_frame()
+        perf_overlay.lap('flip')
+        clock.tick(MAX_RENDER_FPS)
 
 
 def draw_coop_status():
@@ -2795,18 +4688,11 @@ def draw_coop_status():
 
 
 def game_loop():
-    global score
-
     # Initialize controllers at game start
     init_controllers()
 
     while True:
-        score = {
-            'red': 0,
-            'blue': 0,
-            'orange': 0,
-            'purple': 0,
-            'ai': 0}  # Added 'ai' score
+        # Each match starts a new Simulation with fresh scores
         title_screen()
         show_start_message()
         main_game()
@@ -2821,26 +4707,43 @@ def draw_text_with_outline(
         outline_color,
         center=False):
     """Draw text with a black outline."""
-    text_surface = font.render(text, True, text_color)
-    outline_surface = font.render(text, True, outline_color)
+    label = render_text_with_outline(text, font, text_color, outline_color)
 
-    text_rect = text_surface.get_rect()
-    outline_rect = outline_surface.get_rect()
+    # The label has a 2px outline margin around the text itself
+    label_rect = label.get_rect()
     if center:
-        text_rect.center = (x, y)
-        outline_rect.center = (x, y)
+        label_rect.center = (x, y)
     else:
-        text_rect.topleft = (x, y)
-        outline_rect.topleft = (x, y)
+        label_rect.topleft = (x - 2, y - 2)
+
+    mark_dirty(screen.blit(label, label_rect,
+                           special_flags=pygame.BLEND_PREMULTIPLIED))
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text_with_outline(text, font, text_color, outline_color):
+    """Render outlined text once into a single surface with a 2px margin.
+
+    Layers are composited with premultiplied alpha, so blitting the label
+    with BLEND_PREMULTIPLIED matches blitting each layer straight onto
+    the screen.
+    """
+    text_surface = font.render(
+        text, True, text_color).convert_alpha().premul_alpha()
+    outline_surface = font.render(
+        text, True, outline_color).convert_alpha().premul_alpha()
+    width, height = text_surface.get_size()
+
+    label = pygame.Surface((width + 4, height + 4), pygame.SRCALPHA)
 
     # Draw outline
-    screen.blit(outline_surface, (outline_rect.x - 2, outline_rect.y - 2))
-    screen.blit(outline_surface, (outline_rect.x + 2, outline_rect.y - 2))
-    screen.blit(outline_surface, (outline_rect.x - 2, outline_rect.y + 2))
-    screen.blit(outline_surface, (outline_rect.x + 2, outline_rect.y + 2))
+    for offset in ((0, 0), (4, 0), (0, 4), (4, 4)):
+        label.blit(outline_surface, offset,
+                   special_flags=pygame.BLEND_PREMULTIPLIED)
 
     # Draw main text
-    screen.blit(text_surface, text_rect)
+    label.blit(text_surface, (2, 2), special_flags=pygame.BLEND_PREMULTIPLIED)
+    return label
 
 # Add helper function for color interpolation
 
@@ -2851,5 +4754,52 @@ def interpolate_color(color1, color2, factor):
                  for c1, c2 in zip(color1, color2))
 
 
-# Start the game loop
-game_loop()
+def run(argv=None):
+    """Parse the command line, then run the game or the chosen tool.
+
+    Simulation-only runs and benchmarks never open a real window or
+    sound device; --render, --benchmark and --benchmark-arena draw
+    offscreen.
+    """
+    global args, dirty_rect_rendering, frame_capture
+    args = parser.parse_args(argv)
+    dirty_rect_rendering = args.dirty_rects
+    if args.capture or args.capture_checksums:
+        frame_capture = FrameCapture(args.capture, args.capture_checksums)
+    if args.trace:
+        tracer.start(args.trace)
+    perf_overlay.show(args.perf_overlay)
+
+    if args.benchmark_broadphase:
+        benchmark_broadphase()
+    elif args.benchmark_balls:
+        benchmark_ball_storage()
+    elif args.benchmark_audio:
+        init_audio()
+        benchmark_audio()
+    elif args.benchmark_arena:
+        init_display(offscreen=True)
+        benchmark_arena()
+    elif args.benchmark:
+        init_display(offscreen=True)
+        if run_benchmarks(args.benchmark_save, args.benchmark_compare,
+                          args.benchmark_threshold):
+            sys.exit(1)
+    elif args.replay:
+        if args.render:
+            init_display(offscreen=True)
+        run_replay(args.replay, args.render)
+    elif args.headless:
+        if args.render:
+            init_display(offscreen=True)
+        run_headless(args.headless, args.players, args.mode,
+                     args.seed, args.render, args.arena_balls)
+    else:
+        init_audio()
+        init_display()
+        # Start the game loop
+        game_loop()
+
+
+if __name__ == '__main__':
+    run()